@@ -0,0 +1,122 @@
+"""ליבת Levenshtein מהודרת ב-Numba, לסביבות שבהן rapidfuzz אינה מותקנת.
+
+Numba היא תלות אופציונלית; כשהיא חסרה ``jit_levenshtein_similarity`` הוא None
+והשירות משתמש במימוש ה-Python.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Callable, List, Optional, Sequence
+
+try:
+    import numpy as np
+    from numba import njit, prange
+except ImportError:  # pragma: no cover - תלוי בסביבת ההתקנה
+    np = None
+    njit = None
+    prange = None
+
+
+def _codepoints(text: str) -> "np.ndarray":
+    return np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+
+
+jit_levenshtein_similarity: Optional[Callable[[str, str], float]] = None
+jit_batch_levenshtein_similarity: Optional[Callable[..., List[float]]] = None
+
+if njit is not None:
+
+    @njit(cache=True, boundscheck=False)
+    def _levenshtein_kernel(a, b):  # pragma: no cover - מהודר ל-native
+        if a.shape[0] < b.shape[0]:
+            a, b = b, a
+        n = b.shape[0]
+        previous_row = np.arange(n + 1)
+        current_row = np.empty(n + 1, dtype=previous_row.dtype)
+        for i in range(a.shape[0]):
+            current_row[0] = i + 1
+            for j in range(n):
+                cost = 0 if a[i] == b[j] else 1
+                current_row[j + 1] = min(
+                    previous_row[j + 1] + 1,
+                    current_row[j] + 1,
+                    previous_row[j] + cost,
+                )
+            previous_row, current_row = current_row, previous_row
+        return previous_row[n]
+
+    @njit(cache=True, boundscheck=False)
+    def _bounded_similarity(query, value, threshold):  # pragma: no cover - מהודר ל-native
+        query_length = query.shape[0]
+        value_length = value.shape[0]
+        longest = max(query_length, value_length)
+        if longest == 0:
+            return 1.0
+        if query_length == 0 or value_length == 0:
+            return 0.0
+        if 1.0 - (abs(query_length - value_length) / longest) < threshold:
+            # מרחק העריכה אינו קטן מהפרש האורכים, ולכן הסף אינו בר השגה
+            return 0.0
+        return 1.0 - (_levenshtein_kernel(query, value) / longest)
+
+    @njit(cache=True, boundscheck=False, nogil=True)
+    def _batch_kernel(query, buffer, offsets, threshold, out):  # pragma: no cover - מהודר ל-native
+        for k in range(offsets.shape[0] - 1):
+            out[k] = _bounded_similarity(query, buffer[offsets[k]:offsets[k + 1]], threshold)
+
+    @njit(cache=True, boundscheck=False, nogil=True, parallel=True)
+    def _parallel_batch_kernel(query, buffer, offsets, threshold, out):  # pragma: no cover - מהודר ל-native
+        # כל איטרציה כותבת לתא משלה ב-out, ולכן הסדר נשמר גם בריצה מקבילית
+        for k in prange(offsets.shape[0] - 1):
+            out[k] = _bounded_similarity(query, buffer[offsets[k]:offsets[k + 1]], threshold)
+
+    # שכבת ה-threading ‏workqueue של Numba (ברירת המחדל כשאין TBB או OpenMP)
+    # אינה בטוחה לשימוש מקביל: שתי קריאות בו-זמניות לליבה המקבילית מ-threads
+    # שונים מפילות את התהליך. לכן רק קריאה אחת בכל רגע רצה על הליבה המקבילית,
+    # וקריאות אחרות באותו זמן רצות על הליבה הטורית (nogil) במקום להמתין.
+    _parallel_kernel_lock = threading.Lock()
+
+    def _jit_levenshtein_similarity(s1: str, s2: str) -> float:
+        """דמיון Levenshtein מנורמל, בחישוב ליבה מהודרת."""
+        if not s1 and not s2:
+            return 1.0
+        if not s1 or not s2:
+            return 0.0
+        distance = _levenshtein_kernel(_codepoints(s1), _codepoints(s2))
+        return 1.0 - (distance / max(len(s1), len(s2)))
+
+    def _jit_batch_levenshtein_similarity(
+        query: str, values: Sequence[str], threshold: float, *, parallel: bool = False
+    ) -> List[float]:
+        """דמיון Levenshtein בין מחרוזת אחת לרשימת ערכים, בקריאה אחת לליבה.
+
+        כל הערכים מקודדים למערך נקודות-קוד אחד עם מערך היסטים, כך שהמעבר
+        בין Python לקוד המהודר קורה פעם אחת לכל הרשימה. ערכים שהפרש האורכים
+        שלהם לבדו מונע הגעה ל-threshold מקבלים 0.0 בלי חישוב ה-DP.
+        עם parallel=True הרשימה מחולקת בין כל הליבות (numba.prange), אלא אם
+        thread אחר כבר משתמש בליבה המקבילית; אז החישוב רץ בליבה הטורית.
+        """
+        offsets = np.zeros(len(values) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, values), dtype=np.int64, count=len(values)), out=offsets[1:])
+        out = np.empty(len(values), dtype=np.float64)
+        arguments = (_codepoints(query), _codepoints("".join(values)), offsets, threshold, out)
+        if parallel and _parallel_kernel_lock.acquire(blocking=False):
+            try:
+                _parallel_batch_kernel(*arguments)
+            finally:
+                _parallel_kernel_lock.release()
+        else:
+            _batch_kernel(*arguments)
+        return out.tolist()
+
+    jit_levenshtein_similarity = _jit_levenshtein_similarity
+    jit_batch_levenshtein_similarity = _jit_batch_levenshtein_similarity
+
+    def _warm_up() -> None:
+        # הקריאה הראשונה לליבה מהדרת אותה (או טוענת אותה מהמטמון שעל הדיסק,
+        # cache=True). היא נעשית ב-thread רקע עם טעינת המודול, כדי שהחיפוש
+        # הראשון לא ישלם עליה. הליבה המקבילית מחוממת רק בשימוש הראשון בה.
+        jit_levenshtein_similarity("ab", "ba")
+        jit_batch_levenshtein_similarity("ab", ["ba", ""], 0.8)
+
+    threading.Thread(target=_warm_up, name="idlocator-numba-warmup", daemon=True).start()
@@ -7,7 +7,18 @@ import sys
 from typing import Sequence
 
 from .repository import PersonRepository, load_sample_repository
-from .service import IdentityLocator
+from .service import PHONETIC_ALGORITHMS, IdentityLocator
+
+
+def _positive_int(value: str) -> int:
+    """טיפוס argparse למספר שלם חיובי (1 ומעלה)."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ערך לא תקין: {value!r} (נדרש מספר שלם)") from None
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"ערך לא תקין: {number} (נדרש מספר שלם חיובי)")
+    return number
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -23,6 +34,17 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="ביטול שימוש בהתאמת Soundex",
     )
+    parser.add_argument(
+        "--phonetic-algorithm",
+        choices=PHONETIC_ALGORITHMS,
+        default="soundex",
+        help="אלגוריתם ההתאמה הפונטית (ברירת מחדל: soundex)",
+    )
+    parser.add_argument(
+        "--limit",
+        type=_positive_int,
+        help="מספר התוצאות המרבי להצגה (ברירת מחדל: כל התוצאות)",
+    )
     parser.add_argument(
         "--csv",
         type=Path,
@@ -45,7 +67,7 @@ def main(argv: Sequence[str] | None = None) -> int:
     except Exception as e:
         print(f"שגיאה לא צפויה בעת טעינת הקובץ: {e}", file=sys.stderr)
         return 1
-    locator = IdentityLocator(repository)
+    locator = IdentityLocator(repository, phonetic_algorithm=args.phonetic_algorithm)
 
     matches = locator.search(
         id_number=args.id_number,
@@ -55,6 +77,7 @@ def main(argv: Sequence[str] | None = None) -> int:
         city=args.city,
         house_number=args.house_number,
         use_soundex=not args.no_soundex,
+        limit=args.limit,
     )
 
     if not matches:
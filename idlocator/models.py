@@ -2,12 +2,18 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
 
+PERSON_FIELDS = ("id_number", "first_name", "last_name", "street", "city", "house_number")
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class Person:
-    """ייצוג פשוט של רשומת אדם."""
+    """ייצוג פשוט של רשומת אדם.
+
+    המחלקה מוגדרת עם __slots__ (ללא __dict__ לכל מופע), כדי לחסוך זיכרון
+    במאגרים גדולים ולהאיץ גישה לשדות.
+    """
 
     id_number: str
     first_name: str
@@ -39,3 +45,37 @@ class Person:
 def persons_from_dicts(items: Iterable[Dict[str, str]]) -> List[Person]:
     """המרת רשימת מילונים לרשימת אובייקטי Person."""
     return [Person.from_dict(item) for item in items]
+
+
+def persons_from_rows(rows: Iterable[Sequence[str]]) -> List[Person]:
+    """המרת שורות CSV גולמיות (שורת כותרת ואחריה שורות נתונים) לרשימת Person.
+
+    מיקום כל שדה נקבע פעם אחת מתוך שורת הכותרת, כך שלא נוצר מילון לכל שורה.
+    שדה שחסר בכותרת או בשורה מקבל מחרוזת ריקה.
+    """
+    iterator = iter(rows)
+    header = next(iterator, None)
+    if header is None:
+        return []
+    positions = {name: position for position, name in enumerate(header)}
+    field_positions = [positions.get(field_name) for field_name in PERSON_FIELDS]
+
+    persons: List[Person] = []
+    for row in iterator:
+        if not row:
+            continue
+        values = [
+            row[position].strip() if position is not None and position < len(row) else ""
+            for position in field_positions
+        ]
+        persons.append(Person(*values))
+    return persons
+
+
+def persons_from_columns(columns: Mapping[str, Sequence[Optional[str]]]) -> List[Person]:
+    """המרת עמודות (שם שדה -> רשימת ערכים) לרשימת Person.
+
+    כל השדות צריכים להופיע במיפוי; ערך None הופך למחרוזת ריקה.
+    """
+    ordered = [columns[field_name] for field_name in PERSON_FIELDS]
+    return [Person(*[(value or "").strip() for value in row]) for row in zip(*ordered)]
@@ -0,0 +1,57 @@
+"""נרמול ערכי טקסט לצורך השוואה בין שאילתה לרשומות."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import FrozenSet, Optional
+
+from .soundex import daitch_mokotoff, soundex_codes
+
+# טבלאות התרגום נבנות פעם אחת בטעינת המודול ולא בכל קריאה.
+
+# נורמליזציה פונטית בסיסית: החלפת אותיות עם צליל דומה והסרת אמות קריאה נפוצות.
+_PHONETIC_TABLE = str.maketrans({
+    'ט': 'ת', 'כ': 'ק', 'ס': 'ש', 'ב': 'ו', 'צ': 'ז',
+    'א': '', 'ה': '', 'י': ''
+})
+
+# נורמליזציה פונטית אגרסיבית להתאמות כמו "טל אביב" -> "תל אביב".
+# הטבלה מחליפה אותיות דומות ומסירה אמות קריאה ורווחים כדי להשוות את השורש הפונטי.
+_AGGRESSIVE_PHONETIC_TABLE = str.maketrans({
+    'ט': 'ת', 'כ': 'ק', 'ס': 'ש', 'ב': 'פ', 'ו': 'פ', 'צ': 'ז',
+    'א': '', 'ה': '', 'י': '', ' ': ''
+})
+
+
+@dataclass(frozen=True)
+class NormalizedText:
+    """הצורות המנורמלות של ערך טקסט, מחושבות פעם אחת לכל ערך."""
+
+    stripped: str
+    lower: str
+    normalized: str
+    phonetic: str
+    soundex_codes: FrozenSet[str]
+    # קודי Daitch-Mokotoff (לשמות בכתב לטיני בלבד; ריק עבור עברית)
+    daitch_mokotoff_codes: FrozenSet[str]
+
+
+def normalize_for_phonetic_search(text: str) -> str:
+    """מבצע נורמליזציה פונטית בסיסית להשוואה מדויקת יותר."""
+    return text.casefold().translate(_PHONETIC_TABLE)
+
+
+def normalize_text(value: Optional[str]) -> NormalizedText:
+    """מחשבת את כל הצורות המנורמלות של ערך טקסט במעבר אחד."""
+    stripped = (value or "").strip()
+    lower = stripped.casefold()
+    # נורמליזציה של מקפים וגרשיים כדי להתאים "בן-גוריון" ל-"בן גוריון"
+    # ו-"ת"א" ל-"תא"
+    normalized = lower.replace("-", " ").replace("\"", "")
+    return NormalizedText(
+        stripped=stripped,
+        lower=lower,
+        normalized=normalized,
+        phonetic=lower.translate(_AGGRESSIVE_PHONETIC_TABLE),
+        soundex_codes=soundex_codes(stripped),
+        daitch_mokotoff_codes=daitch_mokotoff(stripped),
+    )
@@ -1,12 +1,25 @@
 ﻿"""שכבת גישה לנתונים עבור רשומות אנשים."""
 from __future__ import annotations
 
+import bisect
 import importlib.resources
 import csv
+from collections import defaultdict
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional
-from .models import Person, persons_from_dicts
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from .models import PERSON_FIELDS, Person, persons_from_columns, persons_from_rows
+from .normalization import NormalizedText, normalize_text
 
+try:  # numpy היא תלות אופציונלית; בלעדיה מזהי הערכים נשמרים כרשימות בלבד
+    import numpy as _np
+except ImportError:  # pragma: no cover - תלוי בסביבת ההתקנה
+    _np = None
+
+TEXT_FIELDS = ("first_name", "last_name", "street", "city")
+
+# התו הגבוה ביותר ב-Unicode; כל מחרוזת שמתחילה ב-p קטנה מ-p + _MAX_CHAR
+_MAX_CHAR = chr(0x10FFFF)
 
 
 class PersonRepository:
@@ -17,34 +30,169 @@ class PersonRepository:
         # יצירת אינדקס (מילון) לחיפוש מהיר לפי תעודת זהות.
         # פעולה זו משפרת דרמטית את הביצועים מ-O(n) ל-O(1).
         self._persons_by_id: Dict[str, Person] = {p.id_number: p for p in self._persons}
+        # עמודות מנורמלות מראש לכל שדה טקסט, במקביל לרשימת האנשים (אינדקס i
+        # בכל עמודה שייך ל-self._persons[i]). הנרמול מתבצע פעם אחת בטעינה
+        # במקום בכל השוואה במהלך החיפוש. ערכים זהים (למשל אותה עיר) חולקים
+        # מופע NormalizedText אחד.
+        normalized_by_value: Dict[str, NormalizedText] = {}
+
+        def normalize(value: str) -> NormalizedText:
+            normalized = normalized_by_value.get(value)
+            if normalized is None:
+                normalized = normalized_by_value[value] = normalize_text(value)
+            return normalized
+
+        #
+        # בנוסף, כל עמודה מקודדת כמילון ערכים: רשימת הערכים הייחודיים של השדה,
+        # ולכל רשומה מזהה (מיקום) הערך שלה ברשימה. כך החיפוש מנקד כל ערך ייחודי
+        # פעם אחת ומפזר את הציונים לרשומות לפי המזהים.
+        self._distinct_values: Dict[str, List[NormalizedText]] = {}
+        self._value_ids: Dict[str, List[int]] = {}
+        self._normalized_columns: Dict[str, List[NormalizedText]] = {}
+        for field_name in TEXT_FIELDS:
+            distinct: List[NormalizedText] = []
+            id_by_value: Dict[str, int] = {}
+            value_ids: List[int] = []
+            for person in self._persons:
+                value = getattr(person, field_name)
+                value_id = id_by_value.get(value)
+                if value_id is None:
+                    value_id = id_by_value[value] = len(distinct)
+                    distinct.append(normalize(value))
+                value_ids.append(value_id)
+            self._distinct_values[field_name] = distinct
+            self._value_ids[field_name] = value_ids
+            self._normalized_columns[field_name] = [distinct[value_id] for value_id in value_ids]
+        # עותק numpy של מזהי הערכים, לניקוד וקטורי של עמודות בחיפוש
+        self._value_id_arrays = (
+            {field_name: _np.array(ids, dtype=_np.intp) for field_name, ids in self._value_ids.items()}
+            if _np is not None
+            else {}
+        )
+        # ערכים מנורמלים ייחודיים ממוינים לכל שדה, לאיתור התאמות "מתחיל ב-"
+        # בחיפוש בינארי במקום השוואה מול כל ערך.
+        self._sorted_normalized: Dict[str, List[str]] = {
+            field_name: sorted({value.normalized for value in distinct})
+            for field_name, distinct in self._distinct_values.items()
+        }
+        # אינדקס הפוך לפי עיר (אחרי strip ו-casefold), כך שסינון לפי עיר
+        # הוא בדיקת מפתח במילון במקום מעבר על כל הרשומות.
+        self._indices_by_city: Dict[str, List[int]] = defaultdict(list)
+        for index, city in enumerate(self._normalized_columns["city"]):
+            self._indices_by_city[city.lower].append(index)
+
+    def __len__(self) -> int:
+        return len(self._persons)
+
+    def __getitem__(self, index: int) -> Person:
+        return self._persons[index]
 
     def all(self) -> List[Person]:
         return list(self._persons)
 
+    def normalized_column(self, field_name: str) -> List[NormalizedText]:
+        """מחזירה את העמודה המנורמלת של שדה טקסט (לקריאה בלבד)."""
+        return self._normalized_columns[field_name]
+
+    def distinct_values(self, field_name: str) -> List[NormalizedText]:
+        """מחזירה את הערכים הייחודיים (המנורמלים) של שדה טקסט (לקריאה בלבד)."""
+        return self._distinct_values[field_name]
+
+    def value_ids(self, field_name: str) -> List[int]:
+        """מחזירה לכל רשומה את מיקום הערך שלה ב-distinct_values (לקריאה בלבד)."""
+        return self._value_ids[field_name]
+
+    def value_id_array(self, field_name: str) -> "_np.ndarray":
+        """כמו value_ids, כמערך numpy (זמין רק כאשר numpy מותקנת)."""
+        return self._value_id_arrays[field_name]
+
+    def normalized_values_with_prefix(self, field_name: str, prefix: str) -> Set[str]:
+        """מחזירה את הערכים המנורמלים של השדה שמתחילים ב-prefix."""
+        values = self._sorted_normalized[field_name]
+        start = bisect.bisect_left(values, prefix)
+        end = bisect.bisect_left(values, prefix + _MAX_CHAR, start)
+        return set(values[start:end])
+
     def find_by_id(self, id_number: str) -> Optional[Person]:
         """מציאת אדם לפי תעודת זהות באמצעות חיפוש מהיר במילון."""
-        return self._persons_by_id.get(id_number.strip())
+        # מספרי הזהות במאגר כבר עברו strip בטעינה. רוב השאילתות מגיעות נקיות,
+        # ולכן מנסים קודם חיפוש ישיר ומנקים רווחים רק אם לא נמצאה התאמה.
+        person = self._persons_by_id.get(id_number)
+        if person is None:
+            stripped = id_number.strip()
+            if stripped is not id_number:
+                person = self._persons_by_id.get(stripped)
+        return person
 
     def filter_by_city(self, city: str) -> List[Person]:
-        city = city.strip().lower()
-        return [person for person in self._persons if person.city.lower() == city]
+        return [self._persons[index] for index in self.indices_by_city(city)]
+
+    def indices_by_city(self, city: str) -> List[int]:
+        """מחזירה את אינדקסי הרשומות בעיר הנתונה (לקריאה בלבד)."""
+        return self._indices_by_city.get(city.strip().casefold(), [])
 
     @classmethod
     def from_csv(cls, csv_path: Path) -> "PersonRepository":
         if not csv_path.exists():
             raise FileNotFoundError(f"CSV file not found: {csv_path}")
+        columns = _read_csv_columns_with_arrow(csv_path)
+        if columns is not None:
+            return cls(persons_from_columns(columns))
         with csv_path.open(encoding="utf-8-sig", newline="") as handle:
-            reader = csv.DictReader(handle)
-            return cls(persons_from_dicts(reader))
+            return cls(persons_from_rows(csv.reader(handle)))
 
 
-def load_sample_repository() -> PersonRepository:
-    """טעינת מאגר ברירת המחדל מהקובץ sample_people.csv."""
+def _read_csv_columns_with_arrow(csv_path: Path) -> Optional[Dict[str, Sequence[Optional[str]]]]:
+    """קריאה עמודתית של קובץ CSV באמצעות pyarrow, אם היא מותקנת.
+
+    כל העמודות נקראות כמחרוזות (כדי לשמור אפסים מובילים במספרי זהות), ועמודה
+    חסרה מוחזרת כעמודת None. מחזירה None כאשר pyarrow אינה מותקנת, כשהקובץ
+    אינו תקין בעיניה (למשל שורות באורך שונה) או כשבכותרת יש שם עמודה כפול,
+    ואז נעשה שימוש ב-csv.reader.
+    """
+    try:
+        # ייבוא מקומי: pyarrow כבדה לטעינה ונדרשת רק לקריאת קבצים
+        import pyarrow
+        import pyarrow.csv
+    except ImportError:
+        return None
+
+    # בעמודות כפולות pyarrow לוקחת את הראשונה ו-persons_from_rows את האחרונה.
+    # כדי ששני המסלולים יחזירו אותן רשומות, קובץ כזה נקרא ב-csv.reader.
+    with csv_path.open(encoding="utf-8-sig", newline="") as handle:
+        header = next(csv.reader(handle), [])
+    if len(set(header)) != len(header):
+        return None
+
+    convert_options = pyarrow.csv.ConvertOptions(
+        column_types={field_name: pyarrow.string() for field_name in PERSON_FIELDS},
+        include_columns=list(PERSON_FIELDS),
+        include_missing_columns=True,
+        strings_can_be_null=False,
+    )
+    try:
+        table = pyarrow.csv.read_csv(csv_path, convert_options=convert_options)
+    except pyarrow.ArrowInvalid:
+        return None
+    return table.to_pydict()
+
+
+@lru_cache(maxsize=1)
+def load_sample_people() -> Tuple[Person, ...]:
+    """קריאת קובץ הדוגמה sample_people.csv, פעם אחת לכל תהליך.
+
+    Person אינו ניתן לשינוי, ולכן אפשר לשתף את אותם מופעים בין מאגרים.
+    """
     # Use importlib.resources to safely access data files packaged with the application.
     # This is the modern, standard-library way and is more reliable than relative paths.
     try:
         files = importlib.resources.files("idlocator")
-        with (files / "data" / "sample_people_20.csv").open("r", encoding="utf-8-sig") as f:
-            return PersonRepository(persons_from_dicts(csv.DictReader(f)))
+        with (files / "data" / "sample_people_20.csv").open("r", encoding="utf-8-sig", newline="") as f:
+            return tuple(persons_from_rows(csv.reader(f)))
     except (FileNotFoundError, ModuleNotFoundError) as e:
         raise FileNotFoundError(f"Cannot find the sample data file: {e}") from e
+
+
+def load_sample_repository() -> PersonRepository:
+    """טעינת מאגר ברירת המחדל מהקובץ sample_people.csv."""
+    return PersonRepository(load_sample_people())
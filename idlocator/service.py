@@ -1,16 +1,40 @@
 """לוגיקה עיקרית של חיפוש והתאמת זהות."""
 from __future__ import annotations
 
-from dataclasses import asdict, dataclass
-from typing import Dict, Iterable, List, Optional
+import heapq
+import sys
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
 
 from .models import Person
+from .normalization import NormalizedText, normalize_text
 from .repository import PersonRepository, load_sample_repository
-from .soundex import compare_soundex
 
-@dataclass(frozen=True)
-class MatchResult:
-    """מייצג תוצאה משוקללת של חיפוש."""
+try:  # numpy היא תלות אופציונלית לניקוד וקטורי של עמודות (ונדרשת גם ל-rapidfuzz)
+    import numpy as _np
+except ImportError:  # pragma: no cover - תלוי בסביבת ההתקנה
+    _np = None
+
+try:  # rapidfuzz הוא תלות אופציונלית המספקת מימוש Levenshtein מהיר ב-C++
+    if _np is None:
+        raise ImportError("rapidfuzz.process.cdist requires numpy")
+    from rapidfuzz import process as _rapid_process
+    from rapidfuzz.distance import Levenshtein as _RapidLevenshtein
+
+    _jit_levenshtein_similarity = None
+    _jit_batch_levenshtein_similarity = None
+except ImportError:  # pragma: no cover - תלוי בסביבת ההתקנה
+    _rapid_process = None
+    _RapidLevenshtein = None
+    # בלי rapidfuzz עדיפה ליבה מהודרת ב-Numba (אם מותקנת) על פני מימוש ה-Python
+    from ._distance import jit_batch_levenshtein_similarity as _jit_batch_levenshtein_similarity
+    from ._distance import jit_levenshtein_similarity as _jit_levenshtein_similarity
+
+class MatchResult(NamedTuple):
+    """מייצג תוצאה משוקללת של חיפוש.
+
+    NamedTuple ולא dataclass: תוצאה נוצרת לכל רשומה מתאימה, ויצירת tuple
+    זולה יותר. כמו קודם, התוצאה אינה ניתנת לשינוי.
+    """
 
     person: Person
     score: float
@@ -55,27 +79,44 @@ _ABBREVIATION_MAP: Dict[str, List[str]] = {
     "י-ם": ["ירושלים"],
 }
 
-# בניית מפה דו-כיוונית לחיפוש כינויים יעיל
-_REVERSE_NICKNAME_MAP: Dict[str, List[str]] = {}
-for nickname, full_names in _NICKNAME_MAP.items():
-    for full_name in full_names:
-        if full_name not in _REVERSE_NICKNAME_MAP:
-            _REVERSE_NICKNAME_MAP[full_name] = []
-        _REVERSE_NICKNAME_MAP[full_name].append(nickname)
-
-# בניית מפה דו-כיוונית עבור קיצורים
-_REVERSE_ABBREVIATION_MAP: Dict[str, List[str]] = {}
-for abbr, full_names in _ABBREVIATION_MAP.items():
-    for full_name in full_names:
-        if full_name not in _REVERSE_ABBREVIATION_MAP:
-            _REVERSE_ABBREVIATION_MAP[full_name] = []
-        _REVERSE_ABBREVIATION_MAP[full_name].append(abbr)
+def _build_equivalence_map(mapping: Dict[str, List[str]]) -> Dict[str, FrozenSet[str]]:
+    """בונה מפה דו-כיוונית: לכל שם, קבוצת כל השמות השקולים לו (בשני הכיוונים)."""
+    equivalents: Dict[str, Set[str]] = {}
+    for key, values in mapping.items():
+        key = sys.intern(key)
+        for value in values:
+            value = sys.intern(value)
+            equivalents.setdefault(key, set()).add(value)
+            equivalents.setdefault(value, set()).add(key)
+    return {key: frozenset(values) for key, values in equivalents.items()}
+
+
+# מפות דו-כיווניות לכינויים ולקיצורים: בדיקת התאמה היא חיפוש אחד במילון
+# ובדיקת שייכות אחת לקבוצה.
+_NICKNAME_EQUIVALENTS = _build_equivalence_map(_NICKNAME_MAP)
+_ABBREVIATION_EQUIVALENTS = _build_equivalence_map(_ABBREVIATION_MAP)
+_NO_EQUIVALENTS: FrozenSet[str] = frozenset()
+
+# אלגוריתמי ההתאמה הפונטית הנתמכים
+PHONETIC_ALGORITHMS = ("soundex", "daitch_mokotoff")
 
-class IdentityLocator:
-    """שירות חיפוש זהויות על בסיס נתונים מובנים."""
 
-    def __init__(self, repository: PersonRepository):
+class IdentityLocator:
+    """שירות חיפוש זהויות על בסיס נתונים מובנים.
+
+    phonetic_algorithm קובע את כלל ההתאמה הפונטית: "soundex" (ברירת המחדל)
+    או "daitch_mokotoff", שמבחין בין יותר קבוצות צליל בשמות בכתב לטיני.
+    ערכים בעברית, שאין להם קודי Daitch-Mokotoff, מושווים תמיד לפי Soundex.
+    """
+
+    def __init__(self, repository: PersonRepository, *, phonetic_algorithm: str = "soundex"):
+        if phonetic_algorithm not in PHONETIC_ALGORITHMS:
+            raise ValueError(
+                f"Unknown phonetic algorithm: {phonetic_algorithm!r} "
+                f"(expected one of {', '.join(PHONETIC_ALGORITHMS)})"
+            )
         self.repository = repository
+        self.phonetic_algorithm = phonetic_algorithm
 
     def find_by_id(self, id_number: str) -> Optional[Person]:
         return self.repository.find_by_id(id_number)
@@ -90,8 +131,13 @@ class IdentityLocator:
         city: Optional[str] = None,
         house_number: Optional[str] = None,
         use_soundex: bool = True,
+        limit: Optional[int] = None,
     ) -> List[MatchResult]:
-        """מחזירה רשימת התאמות משוקללות עבור החיפוש."""
+        """מחזירה רשימת התאמות משוקללות עבור החיפוש.
+
+        כאשר limit מוגדר, מוחזרות רק limit ההתאמות הטובות ביותר, בלי למיין
+        ולבנות תוצאה לכל מועמד.
+        """
         if id_number:
             person = self.find_by_id(id_number)
             if not person:
@@ -102,26 +148,37 @@ class IdentityLocator:
         # 1. התחל עם כל האנשים.
         # 2. אם סופקה עיר, סנן תחילה לפיה כדי לצמצם את קבוצת המועמדים.
         #    זהו שיפור ביצועים משמעותי עבור קבצים גדולים.
-        candidates = self.repository.all()
+        candidates: Sequence[int] = range(len(self.repository))
         if city and city.strip():
-            city_matches = self.repository.filter_by_city(city)
+            city_matches = self.repository.indices_by_city(city)
             if city_matches:
                 candidates = city_matches
+        if not candidates:
+            return []
+
+        # הכנת השאילתה (נרמול, צורה פונטית וקודי Soundex) מתבצעת פעם אחת
+        # לכל שדה, לפני המעבר על המועמדים.
+        queries = [
+            (field_name, normalize_text(query))
+            for field_name, query in (
+                ("first_name", first_name),
+                ("last_name", last_name),
+                ("street", street),
+                ("city", city),
+                ("house_number", house_number),
+            )
+            if query and query.strip()
+        ]
 
-        matches: List[MatchResult] = []
-        for person in candidates:
-            result = _evaluate_person(
-                person,
-                first_name=first_name,
-                last_name=last_name,
-                street=street,
-                city=city,
-                house_number=house_number,
-                use_soundex=use_soundex,
+        daitch_mokotoff = self.phonetic_algorithm == "daitch_mokotoff"
+        if limit is not None:
+            return _top_matches(
+                self.repository, candidates, queries, use_soundex, limit, daitch_mokotoff=daitch_mokotoff
             )
-            if result is not None:
-                matches.append(result)
 
+        matches = _score_candidates(
+            self.repository, candidates, queries, use_soundex, daitch_mokotoff=daitch_mokotoff
+        )
         matches.sort(key=lambda item: item.score, reverse=True)
         return matches
 
@@ -129,141 +186,417 @@ def load_default_repository() -> PersonRepository:
     """פונקציית עזר לטעינת מאגר ברירת מחדל."""
     return load_sample_repository()
 
-def _evaluate_person(
-    person: Person,
+def _score_candidates(
+    repository: PersonRepository,
+    candidates: Sequence[int],
+    queries: Sequence[Tuple[str, NormalizedText]],
+    use_soundex: bool,
+    *,
+    daitch_mokotoff: bool = False,
+) -> List[MatchResult]:
+    """מנקדת את כל המועמדים שדה אחר שדה (ניקוד עמודתי)."""
+    total_weight = sum(_FIELD_WEIGHTS[field_name] for field_name, _ in queries)
+    indices, weighted_sums, field_scores = _score_columns(
+        repository, candidates, queries, use_soundex, daitch_mokotoff=daitch_mokotoff
+    )
+    return [
+        MatchResult(
+            person=repository[index],
+            score=_final_score(weighted_sum, total_weight),
+            field_scores=details,
+        )
+        for index, weighted_sum, details in zip(indices, weighted_sums, field_scores)
+    ]
+
+
+def _top_matches(
+    repository: PersonRepository,
+    candidates: Sequence[int],
+    queries: Sequence[Tuple[str, NormalizedText]],
+    use_soundex: bool,
+    limit: int,
     *,
-    first_name: Optional[str],
-    last_name: Optional[str],
-    street: Optional[str],
-    city: Optional[str],
-    house_number: Optional[str],
+    daitch_mokotoff: bool = False,
+) -> List[MatchResult]:
+    """מחזירה את limit ההתאמות הטובות ביותר.
+
+    כל השדות מנוקדים עמודתית, כמו בחיפוש המלא (כל ערך ייחודי פעם אחת), ורק
+    הבחירה משתנה: heapq.nlargest שומר limit מועמדים במקום למיין את כולם,
+    ובונה MatchResult רק להם. nlargest יציב כמו המיון של החיפוש המלא, ולכן
+    התוצאה זהה ל-limit הראשונים ברשימה המלאה.
+    """
+    if limit <= 0:
+        return []
+    total_weight = sum(_FIELD_WEIGHTS[field_name] for field_name, _ in queries)
+    indices, weighted_sums, field_scores = _score_columns(
+        repository, candidates, queries, use_soundex, daitch_mokotoff=daitch_mokotoff
+    )
+    scores = [_final_score(weighted_sum, total_weight) for weighted_sum in weighted_sums]
+    return [
+        MatchResult(
+            person=repository[indices[position]],
+            score=scores[position],
+            field_scores=field_scores[position],
+        )
+        for position in heapq.nlargest(limit, range(len(indices)), key=scores.__getitem__)
+    ]
+
+
+def _score_columns(
+    repository: PersonRepository,
+    candidates: Sequence[int],
+    queries: Sequence[Tuple[str, NormalizedText]],
+    use_soundex: bool,
+    *,
+    daitch_mokotoff: bool = False,
+) -> Tuple[List[int], List[float], List[Dict[str, float]]]:
+    """מנקדת מועמדים שדה אחר שדה ומחזירה את אלו שלא נפסלו.
+
+    כל שדה מנוקד מול עמודת הערכים של המועמדים שנותרו בקריאה אחת, ומועמד
+    שקיבל 0 בשדה כלשהו נפסל ואינו ממשיך לשדות הבאים. מחזירה את אינדקסי
+    המועמדים שנותרו, את הסכום המשוקלל של כל אחד ואת פירוט הניקוד שלו.
+    כאשר numpy מותקנת, הפעולות על השורות (איסוף, סינון וצבירה) וקטוריות.
+    """
+    if _np is not None:
+        indices, weighted_sums, columns = _score_columns_vectorized(
+            repository, candidates, queries, use_soundex, daitch_mokotoff
+        )
+    else:
+        indices, weighted_sums, columns = _score_columns_lists(
+            repository, candidates, queries, use_soundex, daitch_mokotoff
+        )
+    # מילוני הפירוט נבנים רק למועמדים שנותרו בסוף, ולא לכל המאגר מראש
+    field_scores: List[Dict[str, float]] = [{} for _ in indices]
+    for field_name, scores in columns:
+        for details, score in zip(field_scores, scores):
+            details[field_name] = round(score * 100, 2)
+    return indices, weighted_sums, field_scores
+
+
+def _score_columns_lists(
+    repository: PersonRepository,
+    candidates: Sequence[int],
+    queries: Sequence[Tuple[str, NormalizedText]],
+    use_soundex: bool,
+    daitch_mokotoff: bool,
+) -> Tuple[List[int], List[float], List[Tuple[str, List[float]]]]:
+    """מימוש _score_columns ברשימות Python, כאשר numpy אינה מותקנת."""
+    indices = list(candidates)
+    weighted_sums = [0.0] * len(indices)
+    columns: List[Tuple[str, List[float]]] = []
+    for field_name, query in queries:
+        if not indices:
+            break
+        weight = _FIELD_WEIGHTS[field_name]
+        if field_name == "house_number":
+            scores = [
+                _score_house_number(query.stripped, repository[index].house_number) for index in indices
+            ]
+        else:
+            value_ids = repository.value_ids(field_name)
+            row_value_ids = [value_ids[index] for index in indices]
+            present_ids = list(dict.fromkeys(row_value_ids))
+            value_scores = dict(zip(
+                present_ids,
+                _score_distinct_values(
+                    repository, field_name, query, present_ids, use_soundex, daitch_mokotoff
+                ),
+            ))
+            scores = [value_scores[value_id] for value_id in row_value_ids]
+        keep = [position for position, score in enumerate(scores) if score > 0.0]
+        indices = [indices[position] for position in keep]
+        weighted_sums = [weighted_sums[position] + scores[position] * weight for position in keep]
+        columns = [(name, [column[position] for position in keep]) for name, column in columns]
+        columns.append((field_name, [scores[position] for position in keep]))
+    return indices, weighted_sums, columns
+
+
+def _score_columns_vectorized(
+    repository: PersonRepository,
+    candidates: Sequence[int],
+    queries: Sequence[Tuple[str, NormalizedText]],
     use_soundex: bool,
-) -> Optional[MatchResult]:
-    field_scores: Dict[str, float] = {}
-    total_weight = 0.0
-    weighted_sum = 0.0
-
-    def handle_text(field_name: str, query: Optional[str], value: str) -> bool:
-        nonlocal total_weight, weighted_sum
-        if query and query.strip():
-            weight = _FIELD_WEIGHTS[field_name]
-            score = _score_text_field(query, value, use_soundex)
-            field_scores[field_name] = round(score * 100, 2)
-            total_weight += weight
-            if score <= 0.0:
-                return False
-            weighted_sum += score * weight
+    daitch_mokotoff: bool,
+) -> Tuple[List[int], List[float], List[Tuple[str, List[float]]]]:
+    """מימוש _score_columns במערכי numpy.
+
+    הציונים מחושבים לערכים הייחודיים כמו במימוש הרשימות, ומפוזרים לשורות
+    בהצבעה לפי מערך מזהי הערכים. החישובים זהים (אותן פעולות float64 באותו
+    סדר), ולכן גם התוצאות זהות.
+    """
+    if isinstance(candidates, range):
+        indices = _np.arange(candidates.start, candidates.stop, candidates.step)
+    else:
+        indices = _np.asarray(candidates, dtype=_np.intp)
+    weighted_sums = _np.zeros(len(indices))
+    columns = []
+    for field_name, query in queries:
+        if not len(indices):
+            break
+        weight = _FIELD_WEIGHTS[field_name]
+        if field_name == "house_number":
+            scores = _np.array(
+                [
+                    _score_house_number(query.stripped, repository[index].house_number)
+                    for index in indices.tolist()
+                ],
+                dtype=_np.float64,
+            )
+        else:
+            row_value_ids = repository.value_id_array(field_name)[indices]
+            present = _np.zeros(len(repository.distinct_values(field_name)), dtype=bool)
+            present[row_value_ids] = True
+            present_ids = _np.flatnonzero(present)
+            value_scores = _np.zeros(len(present))
+            value_scores[present_ids] = _score_distinct_values(
+                repository, field_name, query, present_ids.tolist(), use_soundex, daitch_mokotoff
+            )
+            scores = value_scores[row_value_ids]
+        keep = scores > 0.0
+        indices = indices[keep]
+        weighted_sums = weighted_sums[keep] + scores[keep] * weight
+        columns = [(name, column[keep]) for name, column in columns]
+        columns.append((field_name, scores[keep]))
+    return (
+        indices.tolist(),
+        weighted_sums.tolist(),
+        [(name, column.tolist()) for name, column in columns],
+    )
+
+
+def _score_distinct_values(
+    repository: PersonRepository,
+    field_name: str,
+    query: NormalizedText,
+    value_ids: Sequence[int],
+    use_soundex: bool,
+    daitch_mokotoff: bool = False,
+) -> List[float]:
+    """מנקדת את הערכים הייחודיים של שדה טקסט לפי המזהים שלהם.
+
+    כל ערך ייחודי בעמודה מנוקד פעם אחת (ערים ורחובות חוזרים על עצמם ברשומות
+    רבות), והציון מועתק לכל הרשומות שמזהה הערך שלהן זהה.
+    """
+    distinct = repository.distinct_values(field_name)
+    prefix_matches = (
+        repository.normalized_values_with_prefix(field_name, query.normalized)
+        if use_soundex
+        else None
+    )
+    return _score_text_column(
+        query,
+        [distinct[value_id] for value_id in value_ids],
+        use_soundex,
+        prefix_matches,
+        daitch_mokotoff=daitch_mokotoff,
+    )
+
+
+def _final_score(weighted_sum: float, total_weight: float) -> float:
+    return round((weighted_sum / total_weight) * 100, 2) if total_weight else 0.0
+
+# סף הדמיון המבני שמעליו התאמה מקבלת ציון 0.8
+_LEVENSHTEIN_MATCH_THRESHOLD = 0.8
+
+# מעל מספר ערכים זה עמודת הדמיון מחושבת במקביל על כל הליבות, מחוץ ל-GIL
+# (rapidfuzz, או ליבת Numba כש-rapidfuzz חסרה). בעמודות קטנות יותר עלות
+# הפעלת התהליכונים גבוהה מהרווח.
+_PARALLEL_LEVENSHTEIN_MIN_VALUES = 5000
+
+
+def _within_length_bound(s1: str, s2: str) -> bool:
+    """בדיקה זולה: האם הפרש האורכים מאפשר בכלל להגיע לסף הדמיון.
+
+    מרחק העריכה לעולם אינו קטן מהפרש האורכים, ולכן 1 - (הפרש / אורך מרבי)
+    הוא חסם עליון לדמיון, המחושב באותה נוסחה כמו הדמיון עצמו.
+    """
+    longest = max(len(s1), len(s2))
+    if not longest:
         return True
+    return 1.0 - (abs(len(s1) - len(s2)) / longest) >= _LEVENSHTEIN_MATCH_THRESHOLD
 
-    if not handle_text("first_name", first_name, person.first_name):
-        return None
-    if not handle_text("last_name", last_name, person.last_name):
-        return None
-    if not handle_text("street", street, person.street):
-        return None
-    if not handle_text("city", city, person.city):
-        return None
-
-    if house_number and house_number.strip():
-        weight = _FIELD_WEIGHTS["house_number"]
-        score = _score_house_number(house_number, person.house_number)
-        field_scores["house_number"] = round(score * 100, 2)
-        total_weight += weight
-        if score <= 0.0:
-            return None
-        weighted_sum += score * weight
-
-    final_score = round((weighted_sum / total_weight) * 100, 2) if total_weight else 0.0
-    return MatchResult(person=person, score=final_score, field_scores=field_scores)
-
-def _normalize_for_phonetic_search(text: str) -> str:
-    """מבצע נורמליזציה פונטית בסיסית להשוואה מדויקת יותר."""
-    text = text.casefold()
-    # החלפת אותיות עם צליל דומה
-    replacements = str.maketrans({
-        'ט': 'ת', 'כ': 'ק', 'ס': 'ש', 'ב': 'ו', 'צ': 'ז',
-        'א': '', 'ה': '', 'י': ''  # הסרת אמות קריאה נפוצות
-    })
-    return text.translate(replacements)
 
 def _levenshtein_similarity(s1: str, s2: str) -> float:
     """מחשב את יחס הדמיון של Levenshtein בין שתי מחרוזות."""
+    if _RapidLevenshtein is not None:
+        return _RapidLevenshtein.normalized_similarity(s1, s2)
+    return _fallback_levenshtein_similarity(s1, s2)
+
+
+def _batch_levenshtein_similarity(query: str, values: Sequence[str]) -> List[float]:
+    """מחשב דמיון Levenshtein בין מחרוזת אחת לרשימת ערכים בקריאה אחת."""
+    if _rapid_process is not None:
+        similarities = _rapid_process.cdist(
+            [query],
+            values,
+            scorer=_RapidLevenshtein.normalized_similarity,
+            dtype=_np.float64,
+            workers=-1 if len(values) >= _PARALLEL_LEVENSHTEIN_MIN_VALUES else 1,
+        )
+        return similarities[0].tolist()
+    if _jit_batch_levenshtein_similarity is not None:
+        return _jit_batch_levenshtein_similarity(
+            query,
+            values,
+            _LEVENSHTEIN_MATCH_THRESHOLD,
+            parallel=len(values) >= _PARALLEL_LEVENSHTEIN_MIN_VALUES,
+        )
+    # בלי rapidfuzz מדלגים על חישוב ה-DP כשהפרש האורכים לבדו מונע הגעה לסף
+    return [
+        _fallback_levenshtein_similarity(query, value) if _within_length_bound(query, value) else 0.0
+        for value in values
+    ]
+
+
+def _fallback_levenshtein_similarity(s1: str, s2: str) -> float:
+    """דמיון Levenshtein כאשר rapidfuzz אינה מותקנת: Numba אם זמינה, אחרת Python."""
+    if _jit_levenshtein_similarity is not None:
+        return _jit_levenshtein_similarity(s1, s2)
+    return _python_levenshtein_similarity(s1, s2)
+
+
+def _python_levenshtein_similarity(s1: str, s2: str) -> float:
+    """מימוש גיבוי ב-Python טהור, בשימוש כאשר rapidfuzz אינה מותקנת."""
     if not s1 and not s2:
         return 1.0
     if not s1 or not s2:
         return 0.0
 
-    m, n = len(s1), len(s2)
-    if m < n:
+    longest = max(len(s1), len(s2))
+    return 1.0 - (_bitparallel_levenshtein_distance(s1, s2) / longest)
+
+
+def _bitparallel_levenshtein_distance(s1: str, s2: str) -> int:
+    """מרחק Levenshtein באלגוריתם bit-parallel של Myers (בניסוח של Hyyrö).
+
+    כל עמודת DP מיוצגת כווקטורי הפרשים (+1/-1) ארוזים בתוך מספר שלם אחד,
+    כך שכל תו של המחרוזת הקצרה מעובד בכמה פעולות ביטים במקום לולאה פנימית.
+    """
+    if len(s1) < len(s2):
         s1, s2 = s2, s1
-        m, n = n, m
-
-    previous_row = list(range(n + 1))
-    for i, c1 in enumerate(s1):
-        current_row = [i + 1]
-        for j, c2 in enumerate(s2):
-            insertions = previous_row[j + 1] + 1
-            deletions = current_row[j] + 1
-            substitutions = previous_row[j] + (c1 != c2)
-            current_row.append(min(insertions, deletions, substitutions))
-        previous_row = current_row
-
-    distance = previous_row[n]
-    return 1.0 - (distance / m)
-
-
-def _score_text_field(query: str, value: str, use_soundex: bool) -> float:
-    query = (query or "").strip()
-    value = (value or "").strip()
-    if not query or not value:
+    m = len(s1)
+    if not s2:
+        return m
+
+    # מסכת מיקומים לכל תו במחרוזת הארוכה (ה"תבנית")
+    peq: Dict[str, int] = {}
+    for i, char in enumerate(s1):
+        peq[char] = peq.get(char, 0) | (1 << i)
+
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv = full
+    mv = 0
+    distance = m
+    for char in s2:
+        eq = peq.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+        if ph & last:
+            distance += 1
+        elif mh & last:
+            distance -= 1
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(xv | ph) & full)
+        mv = ph & xv
+    return distance
+
+
+def _score_text_column(
+    query: NormalizedText,
+    values: Sequence[NormalizedText],
+    use_soundex: bool,
+    prefix_matches: Optional[Set[str]] = None,
+    *,
+    daitch_mokotoff: bool = False,
+) -> List[float]:
+    """מחשבת ציון לשדה טקסט אחד מול רשימת ערכים ייחודיים.
+
+    דמיון ה-Levenshtein מחושב מראש לכל הערכים בקריאה אחת, ושאר כללי
+    ההתאמה מופעלים על כל ערך בנפרד. ערכים שמתחילים בשאילתה (prefix_matches)
+    מקבלים ציון לפני שלב ה-Levenshtein, ולכן אינם נכללים בחישוב המרוכז.
+    """
+    if not use_soundex:
+        return [_score_text_field(query, value, use_soundex) for value in values]
+
+    if prefix_matches:
+        lev_positions: Sequence[int] = [
+            position for position, value in enumerate(values) if value.normalized not in prefix_matches
+        ]
+    else:
+        lev_positions = range(len(values))
+    similarities: List[Optional[float]] = [None] * len(values)
+    batch = _batch_levenshtein_similarity(
+        query.normalized, [values[position].normalized for position in lev_positions]
+    )
+    for position, similarity in zip(lev_positions, batch):
+        similarities[position] = similarity
+    return [
+        _score_text_field(
+            query, value, use_soundex, lev_similarity=similarity, daitch_mokotoff=daitch_mokotoff
+        )
+        for value, similarity in zip(values, similarities)
+    ]
+
+
+def _score_text_field(
+    query: NormalizedText,
+    value: NormalizedText,
+    use_soundex: bool,
+    *,
+    lev_similarity: Optional[float] = None,
+    daitch_mokotoff: bool = False,
+) -> float:
+    if not query.stripped or not value.stripped:
         return 0.0
 
-    query_lower = query.casefold()
-    value_lower = value.casefold()
-
-    # נורמליזציה של מקפים וגרשיים כדי להתאים "בן-גוריון" ל-"בן גוריון"
-    # ו-"ת"א" ל-"תא"
-    query_normalized = query_lower.replace("-", " ").replace("\"", "")
-    value_normalized = value_lower.replace("-", " ").replace("\"", "")
+    query_lower = query.lower
+    value_lower = value.lower
+    query_normalized = query.normalized
+    value_normalized = value.normalized
 
     if query_lower == value_lower:
         return 1.0
 
     # בדיקה דו-כיוונית ויעילה להתאמת כינויים
-    if (query_lower in _NICKNAME_MAP and value_lower in _NICKNAME_MAP[query_lower]) or \
-       (query_lower in _REVERSE_NICKNAME_MAP and value_lower in _REVERSE_NICKNAME_MAP[query_lower]):
+    if value_lower in _NICKNAME_EQUIVALENTS.get(query_lower, _NO_EQUIVALENTS):
         return 0.9
-    
+
     # בדיקת קיצורים (למשל, ת"א -> תל אביב)
-    if (query_normalized in _ABBREVIATION_MAP and value_normalized in _ABBREVIATION_MAP[query_normalized]) or \
-       (query_normalized in _REVERSE_ABBREVIATION_MAP and value_normalized in _REVERSE_ABBREVIATION_MAP[query_normalized]):
+    if value_normalized in _ABBREVIATION_EQUIVALENTS.get(query_normalized, _NO_EQUIVALENTS):
         return 0.9
 
     if value_normalized.startswith(query_normalized):
         return 0.85
 
     if use_soundex:
-        lev_similarity = _levenshtein_similarity(query_normalized, value_normalized)
-        if lev_similarity >= 0.8:
+        if lev_similarity is None:
+            lev_similarity = (
+                _levenshtein_similarity(query_normalized, value_normalized)
+                if _within_length_bound(query_normalized, value_normalized)
+                else 0.0
+            )
+        if lev_similarity >= _LEVENSHTEIN_MATCH_THRESHOLD:
             return 0.8
 
-        if compare_soundex(query, value):
+        # קודי ה-Soundex של ערכי המאגר מחושבים מראש בטעינה (ראו idlocator.normalization)
+        if daitch_mokotoff and query.daitch_mokotoff_codes and value.daitch_mokotoff_codes:
+            sounds_alike = not query.daitch_mokotoff_codes.isdisjoint(value.daitch_mokotoff_codes)
+        else:
+            sounds_alike = not query.soundex_codes.isdisjoint(value.soundex_codes)
+        if sounds_alike:
             return 0.75
 
     if query_normalized in value_normalized:
         return 0.65
 
     if use_soundex:
-        # בדיקה חדשה: נורמליזציה פונטית אגרסיבית יותר להתאמות כמו "טל אביב" -> "תל אביב"
-        # הלוגיקה הזו מחליפה אותיות דומות ומסירה רווחים כדי להשוות את השורש הפונטי.
-        phonetic_replacements = str.maketrans({
-            'ט': 'ת', 'כ': 'ק', 'ס': 'ש', 'ב': 'פ', 'ו': 'פ', 'צ': 'ז',
-            'א': '', 'ה': '', 'י': '', ' ': ''
-        })
-        phonetic_query = query_lower.translate(phonetic_replacements)
-        phonetic_value = value_lower.translate(phonetic_replacements)
-
-        if phonetic_query and phonetic_value and phonetic_query == phonetic_value:
+        # נורמליזציה פונטית אגרסיבית להתאמות כמו "טל אביב" -> "תל אביב",
+        # מחושבת מראש עבור ערכי המאגר (ראו idlocator.normalization).
+        if query.phonetic and value.phonetic and query.phonetic == value.phonetic:
             return 0.60
 
     return 0.0
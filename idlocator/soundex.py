@@ -2,10 +2,15 @@
 from __future__ import annotations
 
 import re
-from typing import Dict, Optional, Set
+from functools import lru_cache, wraps
+from types import MappingProxyType
+from typing import Callable, Dict, Final, FrozenSet, List, Mapping, Optional, Set, Tuple, TypeVar
+
+# The tables below are read-only (MappingProxyType): translate tables are
+# derived from them once at import time and memoized codes depend on them.
 
 # Standard Soundex map for Latin letters (same as traditional implementation).
-_LATIN_SOUNDEX_MAP: Dict[str, str] = {
+_LATIN_SOUNDEX_MAP: Final[Mapping[str, str]] = MappingProxyType({
     "B": "1",
     "F": "1",
     "P": "1",
@@ -24,10 +29,10 @@ _LATIN_SOUNDEX_MAP: Dict[str, str] = {
     "M": "5",
     "N": "5",
     "R": "6",
-}
+})
 
 # Hebrew consonant groupings ? see comments for the linguistic intuition.
-_IMPROVED_HEBREW_SOUNDEX_MAP: Dict[str, str] = {
+_IMPROVED_HEBREW_SOUNDEX_MAP: Final[Mapping[str, str]] = MappingProxyType({
     # Labials ? ?, ?, ?, ?, ?, ?
     "ב": "1",  # ?
     "ו": "1",  # ?
@@ -63,18 +68,21 @@ _IMPROVED_HEBREW_SOUNDEX_MAP: Dict[str, str] = {
     "ה": "0",  # ?
     "י": "0",  # ?
     "ע": "2",  # ? (treated as guttural by default)
-}
+})
 
 # Variants: treat ? (vav) or ? (ayin) as vowels when they serve as matres lectionis.
-_IMPROVED_HEBREW_SOUNDEX_MAP_VAV_AS_VOWEL = dict(_IMPROVED_HEBREW_SOUNDEX_MAP)
-_IMPROVED_HEBREW_SOUNDEX_MAP_VAV_AS_VOWEL["ו"] = "0"  # ?
+_IMPROVED_HEBREW_SOUNDEX_MAP_VAV_AS_VOWEL: Final[Mapping[str, str]] = MappingProxyType(
+    {**_IMPROVED_HEBREW_SOUNDEX_MAP, "ו": "0"}  # ?
+)
 
-_IMPROVED_HEBREW_SOUNDEX_MAP_AYIN_AS_VOWEL = dict(_IMPROVED_HEBREW_SOUNDEX_MAP)
-_IMPROVED_HEBREW_SOUNDEX_MAP_AYIN_AS_VOWEL["ע"] = "0"  # ?
-_IMPROVED_HEBREW_SOUNDEX_MAP_VAV_AYIN_AS_VOWEL = dict(_IMPROVED_HEBREW_SOUNDEX_MAP_VAV_AS_VOWEL)
-_IMPROVED_HEBREW_SOUNDEX_MAP_VAV_AYIN_AS_VOWEL["\u05e2"] = "0"  # ?
+_IMPROVED_HEBREW_SOUNDEX_MAP_AYIN_AS_VOWEL: Final[Mapping[str, str]] = MappingProxyType(
+    {**_IMPROVED_HEBREW_SOUNDEX_MAP, "ע": "0"}  # ?
+)
+_IMPROVED_HEBREW_SOUNDEX_MAP_VAV_AYIN_AS_VOWEL: Final[Mapping[str, str]] = MappingProxyType(
+    {**_IMPROVED_HEBREW_SOUNDEX_MAP_VAV_AS_VOWEL, "\u05e2": "0"}  # ?
+)
 
-_HEBREW_SOUNDEX_VARIANT_MAPS = (
+_HEBREW_SOUNDEX_VARIANT_MAPS: Final = (
     _IMPROVED_HEBREW_SOUNDEX_MAP,
     _IMPROVED_HEBREW_SOUNDEX_MAP_VAV_AS_VOWEL,
     _IMPROVED_HEBREW_SOUNDEX_MAP_AYIN_AS_VOWEL,
@@ -85,7 +93,7 @@ _HEBREW_SOUNDEX_VARIANT_MAPS = (
 _HEBREW_RE = re.compile(r"[֐-׿]")
 
 # Anchor noisy first letters for Latin words to traditional Soundex letters.
-_FIRST_LETTER_ANCHORS: Dict[str, str] = {
+_FIRST_LETTER_ANCHORS: Final[Mapping[str, str]] = MappingProxyType({
     "B": "B",
     "F": "B",
     "P": "B",
@@ -104,9 +112,9 @@ _FIRST_LETTER_ANCHORS: Dict[str, str] = {
     "M": "M",
     "N": "M",
     "R": "R",
-}
+})
 
-_HEBREW_FIRST_LETTER_ANCHORS: Dict[str, str] = {
+_HEBREW_FIRST_LETTER_ANCHORS: Final[Mapping[str, str]] = MappingProxyType({
     "1": "ב",  # ?
     "2": "כ",  # ?
     "3": "ד",  # ?
@@ -114,117 +122,255 @@ _HEBREW_FIRST_LETTER_ANCHORS: Dict[str, str] = {
     "5": "ל",  # ?
     "6": "נ",  # ?
     "7": "ר",  # ?
-}
+})
 
-_HEBREW_PREFIX_LETTERS = "\u05d5\u05d4\u05d1\u05dc"  # ?, ?, ?, ?
+# Common one-letter prefixes (?, ?, ?, ?), stripped when there is more core text.
+_HEBREW_PREFIX_LETTERS: Final = frozenset("\u05d5\u05d4\u05d1\u05dc")
 
+# Final Hebrew letters (?, ?, ?, ?, ?) and their standard form.
+_FINAL_TO_REGULAR: Final[Mapping[str, str]] = MappingProxyType({
+    "ך": "כ",  # ? -> ?
+    "ם": "מ",  # ? -> ?
+    "ן": "נ",  # ? -> ?
+    "ף": "פ",  # ? -> ?
+    "ץ": "צ",  # ? -> ?
+})
 
-def _is_hebrew(value: str) -> bool:
-    return bool(value) and _HEBREW_RE.search(value) is not None
+
+# Ordinals classified eagerly when a translate table is built: ASCII,
+# Latin-1 and the Hebrew block (letters, niqqud and punctuation).
+_PRECLASSIFIED_ORDINALS: Final = (range(0x0000, 0x0100), range(0x0590, 0x0600))
+
+
+def _classify(ordinal: int) -> Optional[str]:
+    """Translation of a character that is not in the Soundex map."""
+    return "0" if chr(ordinal).isalpha() else None
 
 
-def _encode(char: str, soundex_map: Dict[str, str]) -> str:
-    return soundex_map.get(char, "0")
+class _SoundexTranslateTable(dict):
+    """``str.translate`` table from a character to its Soundex digit.
+
+    Letters of the map translate to their digit and final Hebrew letters to
+    the digit of their standard form. Any other letter becomes ``"0"`` and
+    everything else (spaces, punctuation, niqqud) is dropped. Characters of
+    the common blocks are classified when the table is built; any other
+    character is classified on each lookup and not stored, so arbitrary
+    input cannot grow the process-wide tables.
+    """
+
+    def __missing__(self, ordinal: int) -> Optional[str]:
+        return _classify(ordinal)
+
+
+def _build_translate_table(soundex_map: Mapping[str, str]) -> _SoundexTranslateTable:
+    table = _SoundexTranslateTable()
+    for char, digit in soundex_map.items():
+        table[ord(char)] = digit if char.isalpha() else None
+    for final, regular in _FINAL_TO_REGULAR.items():
+        table[ord(final)] = soundex_map.get(regular, "0")
+    for ordinals in _PRECLASSIFIED_ORDINALS:
+        for ordinal in ordinals:
+            if ordinal not in table:
+                table[ordinal] = _classify(ordinal)
+    return table
+
+
+_search_hebrew = _HEBREW_RE.search
+
+
+def _is_hebrew(value: str) -> bool:
+    # isascii() reads a flag of the string object, so Latin input never
+    # reaches the regex engine.
+    return bool(value) and not value.isascii() and _search_hebrew(value) is not None
 
 
 def _has_significant_digit(code: str) -> bool:
-    return any(char != "0" for char in code[1:])
+    return bool(code[1:].strip("0"))
 
 
 def _canonical_first_letter(letter: str) -> str:
     return _FIRST_LETTER_ANCHORS.get(letter, letter)
 
 
-def _canonical_hebrew_first_letter(letter: str, soundex_map: Dict[str, str]) -> str:
-    digit = _encode(letter, soundex_map)
+def _canonical_hebrew_first_letter(letter: str, table: _SoundexTranslateTable) -> str:
+    digit = table[ord(letter)]
     if digit == "0":
         return letter
     return _HEBREW_FIRST_LETTER_ANCHORS.get(digit, letter)
 
 
-def _normalize_hebrew_final_letters(text: str) -> str:
-    """Convert final Hebrew letters (?, ?, ?, ?, ?) to their standard form."""
-    final_to_regular = str.maketrans(
-        {
-            "ך": "כ",  # ? -> ?
-            "ם": "מ",  # ? -> ?
-            "ן": "נ",  # ? -> ?
-            "ף": "פ",  # ? -> ?
-            "ץ": "צ",  # ? -> ?
-        }
-    )
-    return text.translate(final_to_regular)
+# Translate tables for the built-in maps, keyed by map identity.
+_TRANSLATE_TABLES: Dict[int, _SoundexTranslateTable] = {
+    id(soundex_map): _build_translate_table(soundex_map)
+    for soundex_map in (_LATIN_SOUNDEX_MAP, *_HEBREW_SOUNDEX_VARIANT_MAPS)
+}
+
 
+def _translate_table(soundex_map: Mapping[str, str]) -> _SoundexTranslateTable:
+    table = _TRANSLATE_TABLES.get(id(soundex_map))
+    if table is None:
+        table = _build_translate_table(soundex_map)
+    return table
 
-def _strip_hebrew_prefixes(text: str) -> str:
-    """Remove common one-letter prefixes (e.g. ?, ?, ?, ?) when there is more core text."""
-    if len(text) > 2 and text[0] in _HEBREW_PREFIX_LETTERS:
-        return text[1:]
-    return text
 
+# Upper bound on memoized inputs per cache. Repository values are encoded once
+# per distinct value when the index is built, so the caches only need to hold
+# the hot working set of repeated queries, not every value ever seen.
+_SOUNDEX_CACHE_SIZE = 4096
+# Longer inputs are encoded without memoizing them: names, streets and cities
+# are short, and a long free-text value is unlikely to be seen again.
+_MAX_CACHED_LENGTH = 64
 
-def soundex(value: str, *, length: int = 4, _soundex_map_override: Optional[Dict[str, str]] = None) -> Optional[str]:
+_T = TypeVar("_T")
+
+
+def _memoize_short(func: Callable[..., _T]) -> Callable[..., _T]:
+    """Memoize ``func(value, ...)`` for values up to ``_MAX_CACHED_LENGTH`` characters."""
+    cached = lru_cache(maxsize=_SOUNDEX_CACHE_SIZE)(func)
+
+    @wraps(func)
+    def wrapper(value: str, *args: object) -> _T:
+        if len(value) > _MAX_CACHED_LENGTH:
+            return func(value, *args)
+        return cached(value, *args)
+
+    wrapper.cache_info = cached.cache_info  # type: ignore[attr-defined]
+    wrapper.cache_clear = cached.cache_clear  # type: ignore[attr-defined]
+    return wrapper
+
+
+def soundex(value: str, *, length: int = 4, _soundex_map_override: Optional[Mapping[str, str]] = None) -> Optional[str]:
     """Return a Soundex code for the given string."""
+    if _soundex_map_override is None:
+        return _cached_soundex(value, length)
+    return _soundex(value, length, _soundex_map_override)
+
+
+def _soundex(value: str, length: int, _soundex_map_override: Optional[Mapping[str, str]]) -> Optional[str]:
     if not value:
         return None
 
     is_hebrew = _is_hebrew(value)
-    soundex_map: Dict[str, str]
+    soundex_map: Mapping[str, str]
     if is_hebrew:
         soundex_map = _soundex_map_override or _IMPROVED_HEBREW_SOUNDEX_MAP
     else:
         soundex_map = _soundex_map_override or _LATIN_SOUNDEX_MAP
 
+    prepared = _prepare(value, is_hebrew)
+    if prepared is None:
+        return None
+    return _encode_prepared(prepared[0], prepared[1], soundex_map, is_hebrew, length)
+
+
+def _prepare(value: str, is_hebrew: bool) -> Optional[Tuple[str, str]]:
+    """Return the text to encode and its first letter (None if it has no letters).
+
+    This part does not depend on the Soundex map, so the Hebrew variants
+    share it.
+    """
+    # Everything except prefix stripping and Latin upper-casing happens in the
+    # single translate pass of _encode_prepared. Final letters are not prefix
+    # letters, so stripping before the translate table normalizes them is
+    # equivalent. Upper-casing stays a separate pass: str.upper() is not a
+    # one-to-one character mapping (e.g. "ß" -> "SS").
     if is_hebrew:
-        value = _normalize_hebrew_final_letters(value)
-        value = _strip_hebrew_prefixes(value)
-        processed_value = value
+        processed_value = value[1:] if len(value) > 2 and value[0] in _HEBREW_PREFIX_LETTERS else value
     else:
         processed_value = value.upper()
 
-    filtered = [char for char in processed_value if char.isalpha()]
-    if not filtered:
-        return None
-
-    first_letter = filtered[0]
+    first_letter: Optional[str] = processed_value[:1]
+    if not first_letter.isalpha():
+        first_letter = next((char for char in processed_value if char.isalpha()), None)
+        if first_letter is None:
+            return None
+    if is_hebrew:
+        first_letter = _FINAL_TO_REGULAR.get(first_letter, first_letter)
+    return processed_value, first_letter
+
+
+def _encode_prepared(
+    processed_value: str,
+    first_letter: str,
+    soundex_map: Mapping[str, str],
+    is_hebrew: bool,
+    length: int,
+) -> str:
+    # The translate table doubles as the per-letter lookup for the first
+    # letter, so no separate dict.get() is needed.
+    table = _translate_table(soundex_map)
     if is_hebrew:
-        first_letter = _canonical_hebrew_first_letter(first_letter, soundex_map)
+        first_letter = _canonical_hebrew_first_letter(first_letter, table)
     else:
         first_letter = _canonical_first_letter(first_letter)
 
+    # One translate pass encodes every letter and drops everything else, so
+    # the loop below only collapses repeated digits and skips vowels ("0").
+    # It stops as soon as the code is long enough; later letters cannot
+    # change the truncated result.
+    digits = processed_value.translate(table)
     code = [first_letter]
-    prev_digit = _encode(first_letter, soundex_map)
+    prev_digit = table[ord(first_letter)]
 
-    for char in filtered[1:]:
-        digit = _encode(char, soundex_map)
+    for digit in digits[1:]:
         if digit == prev_digit:
             continue
         if digit != "0":
             code.append(digit)
+            if len(code) >= length:
+                break
         prev_digit = digit
 
     return "".join(code)[:length].ljust(length, "0")
 
 
-def _soundex_codes(value: str, length: int) -> Set[str]:
-    codes: Set[str] = set()
+@_memoize_short
+def _cached_soundex(value: str, length: int) -> Optional[str]:
+    return _soundex(value, length, None)
+
+
+@_memoize_short
+def _soundex_codes(value: str, length: int) -> FrozenSet[str]:
+    """Return the Soundex codes of the string; memoized, hence a frozenset."""
     if not value:
-        return codes
+        return frozenset()
 
     if _is_hebrew(value):
-        for mapping in _HEBREW_SOUNDEX_VARIANT_MAPS:
-            code = soundex(value, length=length, _soundex_map_override=mapping)
-            if not code:
-                continue
-            if mapping is not _IMPROVED_HEBREW_SOUNDEX_MAP and not _has_significant_digit(code):
+        prepared = _prepare(value, True)
+        if prepared is None:
+            return frozenset()
+        processed_value, first_letter = prepared
+        # The variant maps differ from the base map only in ? (vav) and
+        # ? (ayin). A variant whose letter does not occur encodes exactly
+        # like a map that is already in the set, so it is skipped.
+        has_vav = "\u05d5" in processed_value
+        has_ayin = "\u05e2" in processed_value
+        codes: Set[str] = {
+            _encode_prepared(processed_value, first_letter, _IMPROVED_HEBREW_SOUNDEX_MAP, True, length)
+        }
+        for mapping, needed in (
+            (_IMPROVED_HEBREW_SOUNDEX_MAP_VAV_AS_VOWEL, has_vav),
+            (_IMPROVED_HEBREW_SOUNDEX_MAP_AYIN_AS_VOWEL, has_ayin),
+            (_IMPROVED_HEBREW_SOUNDEX_MAP_VAV_AYIN_AS_VOWEL, has_vav and has_ayin),
+        ):
+            if not needed:
                 continue
-            codes.add(code)
-        return codes
+            code = _encode_prepared(processed_value, first_letter, mapping, True, length)
+            if _has_significant_digit(code):
+                codes.add(code)
+        return frozenset(codes)
+
+    code = _cached_soundex(value, length)
+    return frozenset((code,)) if code else frozenset()
+
 
-    code = soundex(value, length=length)
-    if code:
-        codes.add(code)
-    return codes
+def soundex_codes(value: str, *, length: int = 4) -> FrozenSet[str]:
+    """Return every Soundex code of the string (one per Hebrew variant map).
+
+    Two strings sound alike, as in ``compare_soundex``, when their code sets
+    intersect, so callers comparing one value many times can compute this once.
+    """
+    return _soundex_codes(value, length)
 
 
 def compare_soundex(value_a: str, value_b: str, *, length: int = 4) -> bool:
@@ -233,4 +379,131 @@ def compare_soundex(value_a: str, value_b: str, *, length: int = 4) -> bool:
     codes_b = _soundex_codes(value_b, length)
     if not codes_a or not codes_b:
         return False
-    return bool(codes_a & codes_b)
+    return not codes_a.isdisjoint(codes_b)
+
+
+# Daitch-Mokotoff Soundex rules for Latin script. Each row lists the letter
+# sequences of a rule and its codes at the start of a name, before a vowel,
+# and in any other position. Alternatives (ambiguous pronunciations) are
+# separated by "|"; an empty code means the sequence is not coded.
+_DAITCH_MOKOTOFF_RULE_ROWS = (
+    ("AI AJ AY", "0", "1", ""),
+    ("AU", "0", "7", ""),
+    ("A", "0", "", ""),
+    ("B", "7", "7", "7"),
+    ("CHS", "5", "54", "54"),
+    ("CH", "5|4", "5|4", "5|4"),
+    ("CK", "5|45", "5|45", "5|45"),
+    ("CSZ CZS CZ CS", "4", "4", "4"),
+    ("C", "5|4", "5|4", "5|4"),
+    ("DRZ DRS DSH DSZ DS DZH DZS DZ", "4", "4", "4"),
+    ("DT D", "3", "3", "3"),
+    ("EI EJ EY", "0", "1", ""),
+    ("EU", "1", "1", ""),
+    ("E", "0", "", ""),
+    ("FB F", "7", "7", "7"),
+    ("G", "5", "5", "5"),
+    ("H", "5", "5", ""),
+    ("IA IE IO IU", "1", "", ""),
+    ("I", "0", "", ""),
+    ("J", "1|4", "|4", "|4"),
+    ("KS", "5", "54", "54"),
+    ("KH K", "5", "5", "5"),
+    ("L", "8", "8", "8"),
+    ("MN NM", "66", "66", "66"),
+    ("M N", "6", "6", "6"),
+    ("OI OJ OY", "0", "1", ""),
+    ("O", "0", "", ""),
+    ("PF PH P", "7", "7", "7"),
+    ("Q", "5", "5", "5"),
+    ("RZ RS", "94|4", "94|4", "94|4"),
+    ("R", "9", "9", "9"),
+    ("SCHTSCH SCHTSH SCHTCH SHTCH SHCH SHTSH STCH STSCH SC", "2", "4", "4"),
+    ("SCHT SCHD SHT", "2", "43", "43"),
+    ("SCH SH", "4", "4", "4"),
+    ("STRZ STRS STSH SZCZ SZCS", "2", "4", "4"),
+    ("SZT SHD SZD SD ST", "2", "43", "43"),
+    ("SZ S", "4", "4", "4"),
+    ("TTSCH TTCH TCH", "4", "4", "4"),
+    ("TH", "3", "3", "3"),
+    ("TRZ TRS TSCH TSH TTSZ TTS TSZ TS TC TTZ TZS TZ", "4", "4", "4"),
+    ("T", "3", "3", "3"),
+    ("UI UJ UY", "0", "1", ""),
+    ("UE U", "0", "", ""),
+    ("V W", "7", "7", "7"),
+    ("X", "5", "54", "54"),
+    ("Y", "1", "", ""),
+    ("ZDZH ZDZ ZHDZH", "2", "4", "4"),
+    ("ZHD ZD", "2", "43", "43"),
+    ("ZSCH ZSH ZH ZS Z", "4", "4", "4"),
+)
+
+_DaitchMokotoffRule = Tuple[str, Tuple[str, ...], Tuple[str, ...], Tuple[str, ...]]
+
+
+def _build_daitch_mokotoff_rules() -> Dict[str, Tuple[_DaitchMokotoffRule, ...]]:
+    rules: Dict[str, List[_DaitchMokotoffRule]] = {}
+    for patterns, at_start, before_vowel, other in _DAITCH_MOKOTOFF_RULE_ROWS:
+        for pattern in patterns.split():
+            rules.setdefault(pattern[0], []).append(
+                (pattern, tuple(at_start.split("|")), tuple(before_vowel.split("|")), tuple(other.split("|")))
+            )
+    # Longest sequence first, so that e.g. "SCH" wins over "SC" and "S".
+    return {
+        letter: tuple(sorted(letter_rules, key=lambda rule: len(rule[0]), reverse=True))
+        for letter, letter_rules in rules.items()
+    }
+
+
+_DAITCH_MOKOTOFF_RULES: Final = MappingProxyType(_build_daitch_mokotoff_rules())
+_DAITCH_MOKOTOFF_VOWELS: Final = frozenset("AEIOU")
+_DAITCH_MOKOTOFF_LENGTH = 6
+
+
+@_memoize_short
+def daitch_mokotoff(value: str) -> FrozenSet[str]:
+    """Return the Daitch-Mokotoff Soundex codes of a Latin-script name.
+
+    Daitch-Mokotoff codes are six digits long and distinguish more sound
+    groups than classic Soundex. Ambiguous letters (e.g. "CH", "J", "RZ")
+    branch into several codes. The rules are defined for Latin letters only,
+    so Hebrew text (and text without Latin letters) has no codes.
+    """
+    if not value or _is_hebrew(value):
+        return frozenset()
+    text = "".join(char for char in value.upper() if "A" <= char <= "Z")
+    if not text:
+        return frozenset()
+
+    # Each branch is (code so far, last replacement); None means "nothing yet".
+    branches: List[Tuple[str, Optional[str]]] = [("", None)]
+    index = 0
+    last_letter = ""
+    while index < len(text):
+        letter = text[index]
+        for pattern, at_start, before_vowel, other in _DAITCH_MOKOTOFF_RULES[letter]:
+            if text.startswith(pattern, index):
+                break
+        next_index = index + len(pattern)
+        if not last_letter:
+            replacements = at_start
+        elif next_index < len(text) and text[next_index] in _DAITCH_MOKOTOFF_VOWELS:
+            replacements = before_vowel
+        else:
+            replacements = other
+        # Adjacent "M" and "N" are both coded even when their codes repeat.
+        force = (last_letter, letter) in (("M", "N"), ("N", "M"))
+
+        next_branches: Dict[str, Tuple[str, Optional[str]]] = {}
+        for code, last_replacement in branches:
+            for replacement in replacements:
+                if force or replacement != last_replacement:
+                    new_code = (code + replacement)[:_DAITCH_MOKOTOFF_LENGTH]
+                else:
+                    new_code = code
+                next_branches.setdefault(new_code, (new_code, replacement))
+        branches = list(next_branches.values())
+        last_letter = letter
+        index = next_index
+
+    return frozenset(code.ljust(_DAITCH_MOKOTOFF_LENGTH, "0") for code, _ in branches)
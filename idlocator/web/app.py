@@ -1,19 +1,24 @@
 """יישום Flask להצגת מסך טעינת קבצים וחיפוש תוצאות."""
 from __future__ import annotations
 
-import base64
-import binascii
 import csv
 import io
-import json
 import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
 
-from flask import Flask, redirect, render_template, request, url_for
+from flask import Flask, current_app, jsonify, redirect, render_template, request, session, url_for
 from jinja2.exceptions import TemplateNotFound
 
-from ..models import Person, persons_from_dicts
+from ..models import persons_from_rows
 from ..repository import PersonRepository, load_sample_repository
 from ..service import IdentityLocator, MatchResult
 
@@ -24,34 +29,200 @@ TEMPLATE_FILE = PROJECT_ROOT / "data" / "people_template.csv"
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__, template_folder=str(WEB_APP_DIR))
-app.config["MAX_CONTENT_LENGTH"] = 10 * 1024 * 1024  # 10MB
+# מאגרים שהועלו נשמרים בצד השרת, כשהם כבר מאונדקסים, תחת אסימון אקראי
+# שנשמר ב-session של המשתמש. כך כל חיפוש משתמש במאגר המוכן במקום לשלוח את
+# כל הקובץ הלוך ושוב בטופס ולבנות ממנו מאגר מחדש. המטמון מוגבל במספר
+# המאגרים, בסך הרשומות בכל המאגרים יחד (הזיכרון תלוי בהן ולא במספר הקבצים)
+# ובזמן חוסר שימוש; הפריט שלא נעשה בו שימוש הכי הרבה זמן נזרק ראשון.
+_DATASET_SESSION_KEY = "dataset_token"
+_LOCATOR_CACHE_MAX_ENTRIES = 16
+_LOCATOR_CACHE_MAX_ROWS = 500_000
+_LOCATOR_CACHE_TTL_SECONDS = 60 * 60
+# מספר הרשומות המרבי בקובץ אחד שמועלה
+_MAX_UPLOAD_ROWS = 200_000
+_DATASET_UNAVAILABLE = "הקובץ שהעלית אינו זמין עוד. מוצגים נתוני הדוגמה."
 
+# פירוק ואינדוקס של קובץ שהועלה רצים ב-thread רקע, כדי שקובץ גדול לא יחזיק
+# את תהליך הבקשה. הבקשה ממתינה זמן קצר, כך שקבצים קטנים נטענים כרגיל באותה
+# תשובה; אחרת הדף מציג הודעת עיבוד ובודק את המצב ב-/dataset/status.
+_UPLOAD_WORKERS = 2
+_UPLOAD_INLINE_WAIT_SECONDS = 0.5
+# מספר הקבצים המרבי שממתינים לעיבוד או מעובדים בו בזמן. מעבר לכך העלאה
+# חדשה נדחית (429), כדי שהתור של ה-executor לא יחזיק תוכן קבצים ללא גבול.
+_MAX_PENDING_UPLOADS = 4
 
-def _encode_people_data(rows: List[Dict[str, str]]) -> str:
-    if not rows:
-        return ""
-    payload = json.dumps(rows, ensure_ascii=False)
-    return base64.b64encode(payload.encode("utf-8")).decode("ascii")
+_upload_executor = ThreadPoolExecutor(max_workers=_UPLOAD_WORKERS, thread_name_prefix="idlocator-upload")
 
 
-def _decode_people_data(payload: Optional[str]) -> Optional[List[Dict[str, str]]]:
-    if not payload:
+class _PendingUpload(NamedTuple):
+    """קובץ שהועלה ועדיין לא נקלט: שם הקובץ והעבודה שבונה ממנו מאתר."""
+
+    filename: str
+    future: "Future[IdentityLocator]"
+
+
+_CacheEntry = Union[IdentityLocator, _PendingUpload]
+
+
+class _UploadTooLargeError(ValueError):
+    """הקובץ שהועלה מכיל יותר מ-_MAX_UPLOAD_ROWS רשומות."""
+
+
+_locator_cache: "OrderedDict[str, Tuple[float, _CacheEntry]]" = OrderedDict()
+_locator_cache_lock = threading.Lock()
+
+
+def _entry_rows(entry: _CacheEntry) -> int:
+    # קובץ בעיבוד עוד לא תופס את זיכרון המאגר; הוא נספר כשהמאתר נשמר במקומו
+    return len(entry.repository) if isinstance(entry, IdentityLocator) else 0
+
+
+def _release(entry: _CacheEntry) -> None:
+    """מבטלת את העיבוד של קובץ שיצא מהמטמון לפני שהעיבוד התחיל."""
+    # עיבוד שכבר רץ אינו ניתן לעצירה; התוצאה שלו פשוט לא תישמר
+    if isinstance(entry, _PendingUpload):
+        entry.future.cancel()
+
+
+def _put_locked(token: str, entry: _CacheEntry) -> None:
+    """שומרת רשומה ומפנה רשומות ישנות; נקראת כשהנעילה של המטמון מוחזקת."""
+    _locator_cache[token] = (time.monotonic(), entry)
+    _locator_cache.move_to_end(token)
+    total_rows = sum(_entry_rows(cached_entry) for _, cached_entry in _locator_cache.values())
+    # הרשומה שנשמרה עכשיו נשארת תמיד; הגבלת גודל קובץ בודד נעשית בהעלאה
+    while len(_locator_cache) > 1 and (
+        len(_locator_cache) > _LOCATOR_CACHE_MAX_ENTRIES or total_rows > _LOCATOR_CACHE_MAX_ROWS
+    ):
+        _, (_, evicted) = _locator_cache.popitem(last=False)
+        total_rows -= _entry_rows(evicted)
+        _release(evicted)
+
+
+def _store_locator(entry: _CacheEntry, token: Optional[str] = None) -> str:
+    token = token or secrets.token_urlsafe(16)
+    with _locator_cache_lock:
+        _put_locked(token, entry)
+    return token
+
+
+def _cached_entry(token: Optional[str]) -> Optional[_CacheEntry]:
+    if not token:
         return None
+    now = time.monotonic()
+    with _locator_cache_lock:
+        cached = _locator_cache.get(token)
+        if cached is None:
+            return None
+        last_used, entry = cached
+        if now - last_used > _LOCATOR_CACHE_TTL_SECONDS:
+            del _locator_cache[token]
+            _release(entry)
+            return None
+        _locator_cache[token] = (now, entry)
+        _locator_cache.move_to_end(token)
+        return entry
+
+
+def _cached_locator(token: Optional[str]) -> Optional[IdentityLocator]:
+    entry = _cached_entry(token)
+    return entry if isinstance(entry, IdentityLocator) else None
+
+
+def _discard_locator(token: Optional[str]) -> None:
+    if token:
+        with _locator_cache_lock:
+            cached = _locator_cache.pop(token, None)
+        if cached is not None:
+            _release(cached[1])
+
+
+def _submit_upload(filename: str, data: bytes, replaced_token: Optional[str]) -> Optional[str]:
+    """מתחילה לעבד קובץ שהועלה במקום המאגר של replaced_token ומחזירה את האסימון שלו.
+
+    None מוחזר, בלי לשנות את המטמון, כשכבר יש _MAX_PENDING_UPLOADS קבצים
+    בעיבוד. קובץ קודם של אותו משתמש שעדיין בעיבוד אינו נספר, כי הוא מוחלף.
+    """
+    with _locator_cache_lock:
+        in_flight = sum(
+            1
+            for token, (_, entry) in _locator_cache.items()
+            if token != replaced_token and isinstance(entry, _PendingUpload) and not entry.future.done()
+        )
+        if in_flight >= _MAX_PENDING_UPLOADS:
+            return None
+        replaced = _locator_cache.pop(replaced_token, None) if replaced_token else None
+        token = secrets.token_urlsafe(16)
+        _put_locked(token, _PendingUpload(filename, _upload_executor.submit(_parse_upload, data)))
+    if replaced is not None:
+        _release(replaced[1])
+    return token
+
+
+def _limit_rows(rows: Iterable[List[str]]) -> Iterator[List[str]]:
+    """מעבירה את השורות הלאה ועוצרת ברגע שיש יותר מ-_MAX_UPLOAD_ROWS שורות נתונים."""
+    data_rows = -1  # שורת הכותרת אינה נספרת
+    for row in rows:
+        if row:
+            data_rows += 1
+            if data_rows > _MAX_UPLOAD_ROWS:
+                raise _UploadTooLargeError(data_rows)
+        yield row
+
+
+def _parse_upload(data: bytes) -> IdentityLocator:
+    """בונה מאתר מתוכן קובץ CSV שהועלה; רץ ב-thread הרקע."""
+    # התוכן מפוענח תוך כדי קריאה, בלי עותק str של כל הקובץ. מיקומי העמודות
+    # נקבעים פעם אחת מהכותרת וכל שורה הופכת ישירות ל-Person.
+    stream = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig", newline="")
+    return IdentityLocator(PersonRepository(persons_from_rows(_limit_rows(csv.reader(stream)))))
+
+
+def _resolve_upload(token: str, pending: _PendingUpload, timeout: float) -> Optional[Dict[str, str]]:
+    """מחכה לכל היותר timeout שניות לעיבוד הקובץ ומחזירה הודעה למשתמש.
+
+    כשהעיבוד הסתיים המאתר מחליף את הרשומה הממתינה במטמון (או שהרשומה נמחקת
+    אם העיבוד נכשל). None מוחזר כשהקובץ עדיין בעיבוד.
+    """
+    unavailable = {"text": _DATASET_UNAVAILABLE, "type": "info"}
     try:
-        raw = base64.b64decode(payload.encode("ascii"))
-        return json.loads(raw.decode("utf-8"))
-    except (binascii.Error, json.JSONDecodeError, UnicodeDecodeError) as exc:
-        logger.warning("Failed to decode uploaded dataset: %s", exc)
+        locator = pending.future.result(timeout=timeout)
+    except FutureTimeoutError:
         return None
+    except CancelledError:
+        return unavailable
+    except _UploadTooLargeError:
+        _discard_locator(token)
+        return {"text": f"הקובץ גדול מדי. ניתן לטעון עד {_MAX_UPLOAD_ROWS:,} רשומות.", "type": "error"}
+    except (UnicodeDecodeError, csv.Error):
+        _discard_locator(token)
+        return {"text": "טעינת הקובץ נכשלה. ודא שהקובץ בפורמט CSV ושהקידוד שלו UTF-8.", "type": "error"}
+    except Exception:
+        logger.exception("Error processing uploaded file")
+        _discard_locator(token)
+        return {"text": "אירעה שגיאה בעת ניסיון לעבד את הקובץ.", "type": "error"}
+    with _locator_cache_lock:
+        # הרשומה הממתינה יכלה להיזרק מהמטמון (או להיות מוחלפת) בזמן העיבוד
+        cached = _locator_cache.get(token)
+        if cached is None or cached[1] is not pending:
+            return unavailable
+        _put_locked(token, locator)
+    return {"text": f"הקובץ '{pending.filename}' נטען בהצלחה.", "type": "success"}
+
+
+@lru_cache(maxsize=1)
+def _sample_locator() -> IdentityLocator:
+    """מאתר נתוני הדוגמה, נבנה פעם אחת לכל תהליך ומשותף לכל הבקשות.
 
+    השיתוף בטוח כי החיפוש אינו משנה את המאגר.
+    """
+    return IdentityLocator(load_sample_repository())
 
-def _build_locator(rows: Optional[List[Dict[str, str]]]) -> tuple[IdentityLocator, bool]:
-    if rows:
-        repo = PersonRepository(persons_from_dicts(rows))
-        return IdentityLocator(repo), True
-    repo = load_sample_repository()
-    return IdentityLocator(repo), False
+
+def _build_locator(token: Optional[str]) -> tuple[IdentityLocator, bool]:
+    locator = _cached_locator(token)
+    if locator is not None:
+        return locator, True
+    return _sample_locator(), False
 
 
 def _extract_search_params() -> Dict[str, Any]:
@@ -67,6 +238,12 @@ def _extract_search_params() -> Dict[str, Any]:
     return params
 
 
+# מספר התוצאות המרבי שמוצג בדף. החיפוש בוחר רק את הטובות ביותר (limit),
+# במקום למיין ולבנות התאמה לכל רשומה במאגר שהועלה. מבוקשת תוצאה אחת נוספת,
+# כדי לדעת אם נחתכו תוצאות.
+_MAX_DISPLAYED_RESULTS = 100
+
+
 def _search(locator: IdentityLocator, params: Dict[str, Any]) -> List[MatchResult]:
     return locator.search(
         id_number=params.get("id_number") or None,
@@ -76,50 +253,76 @@ def _search(locator: IdentityLocator, params: Dict[str, Any]) -> List[MatchResul
         city=params.get("city") or None,
         house_number=params.get("house_number") or None,
         use_soundex=params.get("use_soundex", True),
+        limit=_MAX_DISPLAYED_RESULTS + 1,
     )
 
 
-@app.route("/", methods=["GET", "POST"])
-def index() -> str:
+def dataset_status() -> Any:
+    """מצב הקובץ שהועלה, לבדיקה חוזרת מהדף בזמן העיבוד."""
+    entry = _cached_entry(session.get(_DATASET_SESSION_KEY))
+    if entry is None:
+        return jsonify(status="sample")
+    if isinstance(entry, _PendingUpload) and not entry.future.done():
+        return jsonify(status="processing")
+    return jsonify(status="ready")
+
+
+def index() -> Any:
     messages: List[Dict[str, str]] = []
     results: Optional[List[MatchResult]] = None
+    processing = False
+    status_code = 200
 
     if "clear" in request.args:
         return redirect(url_for("index"))
 
-    people_data_payload = ""
-    people_rows: Optional[List[Dict[str, str]]] = None
     search_params: Dict[str, Any] = {"use_soundex": True}
 
+    dataset_token = session.get(_DATASET_SESSION_KEY)
+    entry = _cached_entry(dataset_token)
+    if isinstance(entry, _PendingUpload):
+        message = _resolve_upload(dataset_token, entry, timeout=0)
+        if message is None:
+            processing = True
+        else:
+            messages.append(message)
+    locator, using_uploaded = _build_locator(dataset_token)
+    if dataset_token and not using_uploaded and not processing:
+        session.pop(_DATASET_SESSION_KEY, None)
+        if entry is None:
+            messages.append({"text": _DATASET_UNAVAILABLE, "type": "info"})
+
     if request.method == "POST":
-        people_data_payload = request.form.get("people_data_payload", "")
-        people_rows = _decode_people_data(people_data_payload)
         search_params = _extract_search_params()
-        locator, using_uploaded = _build_locator(people_rows)
 
         if "upload" in request.form and request.files.get("csv_file") and request.files["csv_file"].filename:
             file = request.files["csv_file"]
-            try:
-                stream = io.StringIO(file.stream.read().decode("utf-8-sig"), newline="")
-                reader = csv.DictReader(stream)
-                rows = [dict(row) for row in reader]
-                people_rows = rows
-                people_data_payload = _encode_people_data(rows)
-                locator, using_uploaded = _build_locator(rows)
-                messages.append({"text": f"הקובץ '{file.filename}' נטען בהצלחה.", "type": "success"})
-            except (UnicodeDecodeError, csv.Error):
-                messages.append({"text": "טעינת הקובץ נכשלה. ודא שהקובץ בפורמט CSV ושהקידוד שלו UTF-8.", "type": "error"})
-            except Exception:
-                logger.exception("Error processing uploaded file")
-                messages.append({"text": "אירעה שגיאה בעת ניסיון לעבד את הקובץ.", "type": "error"})
+            # זרם הבקשה נסגר בסוף הבקשה, ולכן התוכן נקרא כאן ומועבר ל-thread הרקע
+            token = _submit_upload(file.filename, file.read(), session.get(_DATASET_SESSION_KEY))
+            if token is None:
+                status_code = 429
+                messages.append({"text": "השרת מעבד כעת קבצים רבים. נסה להעלות את הקובץ שוב בעוד מספר דקות.", "type": "error"})
+            else:
+                session[_DATASET_SESSION_KEY] = token
+                pending = _cached_entry(token)
+                if isinstance(pending, _PendingUpload):
+                    message = _resolve_upload(token, pending, timeout=_UPLOAD_INLINE_WAIT_SECONDS)
+                else:
+                    message = {"text": _DATASET_UNAVAILABLE, "type": "info"}
+                processing = message is None
+                if message is not None:
+                    messages.append(message)
+                    if message["type"] != "success":
+                        session.pop(_DATASET_SESSION_KEY, None)
+            locator, using_uploaded = _build_locator(session.get(_DATASET_SESSION_KEY))
             results = None
         elif "reset_sample" in request.form:
-            people_rows = None
-            people_data_payload = ""
+            _discard_locator(session.pop(_DATASET_SESSION_KEY, None))
             locator, using_uploaded = _build_locator(None)
+            processing = False
             messages.append({"text": "המערכת חזרה לקובץ הדוגמה.", "type": "success"})
             results = None
-        else:
+        elif not processing:
             if any(search_params.get(key) for key in [
                 "id_number",
                 "first_name",
@@ -132,30 +335,62 @@ def index() -> str:
                     results = _search(locator, search_params)
                     if not results:
                         messages.append({"text": "לא נמצאו תוצאות עבור פרטי החיפוש שסיפקת.", "type": "info"})
+                    elif len(results) > _MAX_DISPLAYED_RESULTS:
+                        results = results[:_MAX_DISPLAYED_RESULTS]
+                        messages.append({
+                            "text": f"מוצגות {_MAX_DISPLAYED_RESULTS} ההתאמות הטובות ביותר. צמצם את החיפוש כדי למקד את התוצאות.",
+                            "type": "info",
+                        })
                 except Exception:
                     logger.exception("Search failed")
                     messages.append({"text": "אירעה שגיאה בעת ניסיון לבצע את החיפוש. נסה שוב מאוחר יותר.", "type": "error"})
-            using_uploaded = bool(people_rows)
-    else:
-        locator, using_uploaded = _build_locator(None)
+
+    if processing:
+        messages.append({"text": "הקובץ שהעלית עדיין בעיבוד. החיפוש יתאפשר כשהטעינה תסתיים.", "type": "info"})
 
     current_data = locator.repository.all()
 
     try:
-        return render_template(
+        page = render_template(
             "index.html",
             messages=messages,
             results=results,
             search=search_params,
             current_data=current_data,
             using_uploaded=using_uploaded,
-            people_data_payload=people_data_payload,
+            processing=processing,
         )
+        return page, (202 if processing else status_code)
     except TemplateNotFound:
-        error_msg = f"שגיאת תבנית: הקובץ 'index.html' לא נמצא. ודא שקובץ התבנית קיים בתיקיית: {app.template_folder}"
+        error_msg = f"שגיאת תבנית: הקובץ 'index.html' לא נמצא. ודא שקובץ התבנית קיים בתיקיית: {current_app.template_folder}"
         logger.error(error_msg)
         return f"<h1>{error_msg}</h1>", 500
 
 
+def create_app(config: Optional[Dict[str, Any]] = None) -> Flask:
+    """יוצרת מופע Flask חדש של הממשק, עם הגדרות נוספות אופציונליות.
+
+    מאגרים שהועלו נשמרים במטמון משותף לתהליך, תחת אסימונים אקראיים, כך
+    שכמה מופעים באותו תהליך (למשל בבדיקות) אינם רואים זה את נתוני זה.
+    """
+    app = Flask(__name__, template_folder=str(WEB_APP_DIR))
+    app.config["MAX_CONTENT_LENGTH"] = 10 * 1024 * 1024  # 10MB
+    # מפתח לחתימת עוגיית ה-session. בפריסה עם כמה תהליכים יש להגדיר מפתח קבוע
+    # במשתנה הסביבה, אחרת כל תהליך יוצר מפתח משלו.
+    app.config["SECRET_KEY"] = os.environ.get("IDLOCATOR_SECRET_KEY") or secrets.token_hex(32)
+    # Firebase Hosting מעביר ל-Cloud Run רק עוגייה בשם __session
+    app.config["SESSION_COOKIE_NAME"] = "__session"
+    if config:
+        app.config.update(config)
+
+    app.add_url_rule("/", view_func=index, methods=["GET", "POST"])
+    app.add_url_rule("/dataset/status", view_func=dataset_status)
+    return app
+
+
+# המופע שמשמש את gunicorn (idlocator.web.app:app) ואת ההרצה הישירה
+app = create_app()
+
+
 if __name__ == "__main__":
     app.run(debug=True, port=5000, host="127.0.0.1")
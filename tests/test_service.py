@@ -1,21 +1,36 @@
+import os
+import subprocess
+import sys
+import tempfile
 import unittest
+from pathlib import Path
+from unittest import mock
 
+from idlocator._distance import jit_batch_levenshtein_similarity, jit_levenshtein_similarity
 from idlocator.models import Person
 from idlocator.repository import PersonRepository, load_sample_repository
-from idlocator.service import IdentityLocator, MatchResult
-from idlocator.soundex import compare_soundex, soundex
+from idlocator.service import (
+    IdentityLocator,
+    MatchResult,
+    _bitparallel_levenshtein_distance,
+    _levenshtein_similarity,
+    _python_levenshtein_similarity,
+)
+from idlocator.soundex import compare_soundex, daitch_mokotoff, soundex, soundex_codes
 
 
 class IdentityLocatorTests(unittest.TestCase):
-    def setUp(self) -> None:
-        # יצירת מאגר נתונים מדומה בזיכרון עבור הבדיקות
+    @classmethod
+    def setUpClass(cls) -> None:
+        # יצירת מאגר נתונים מדומה בזיכרון עבור הבדיקות. המאגר נבנה פעם אחת
+        # למחלקה: החיפוש אינו משנה אותו, ולכן הבדיקות אינן תלויות זו בזו.
         mock_people = [
             Person(id_number="200000001", first_name="אור", last_name="כהן", street="הרצל", city="תל אביב", house_number="12"),
             Person(id_number="200000002", first_name="טל", last_name="לוי", street="ביאליק", city="חיפה", house_number="5"),
             Person(id_number="200000003", first_name="יעל", last_name="שחר", street="אחד העם", city="ירושלים", house_number="10"),
         ]
-        self.repository = PersonRepository(mock_people)
-        self.locator = IdentityLocator(self.repository)
+        cls.repository = PersonRepository(mock_people)
+        cls.locator = IdentityLocator(cls.repository)
 
     def test_find_by_id_returns_person(self) -> None:
         # בדיקה מול נתונים מקובץ sample_people_20.csv
@@ -23,6 +38,12 @@ class IdentityLocatorTests(unittest.TestCase):
         self.assertIsNotNone(person)
         self.assertEqual(person.full_name, "אור כהן")
 
+    def test_search_in_empty_repository_returns_nothing(self) -> None:
+        locator = IdentityLocator(PersonRepository([]))
+        self.assertEqual(locator.search(last_name="כהן"), [])
+        self.assertEqual(locator.search(last_name="כהן", limit=5), [])
+        self.assertEqual(locator.search(id_number="000000000"), [])
+
     def test_search_by_name_with_soundex(self) -> None:
         # בדיקת חיפוש פונטי בעברית לפי שם משפחה
         results = self.locator.search(last_name="כהן", use_soundex=True)
@@ -55,6 +76,63 @@ class IdentityLocatorTests(unittest.TestCase):
         self.assertAlmostEqual(match.score, 100.0)
 
 
+    def test_search_limit_returns_best_matches_in_order(self) -> None:
+        locator = IdentityLocator(load_sample_repository())
+        all_matches = locator.search(city="תל אביב")
+        top_matches = locator.search(city="תל אביב", limit=2)
+        self.assertEqual(
+            [(match.person.id_number, match.score) for match in top_matches],
+            [(match.person.id_number, match.score) for match in all_matches[:2]],
+        )
+
+    def test_search_limit_with_several_fields_keeps_tie_order(self) -> None:
+        locator = IdentityLocator(PersonRepository([
+            Person(id_number=str(i), first_name=first, last_name="כהן", street="", city="", house_number="")
+            for i, first in enumerate(["אור", "אורי", "אור", "אורן", "אור"])
+        ]))
+        all_matches = locator.search(first_name="אור", last_name="כהן")
+        top_matches = locator.search(first_name="אור", last_name="כהן", limit=3)
+        self.assertEqual([match.person.id_number for match in top_matches], ["0", "2", "4"])
+        self.assertEqual(top_matches, all_matches[:3])
+
+    def test_nickname_matches_in_both_directions(self) -> None:
+        locator = IdentityLocator(PersonRepository([
+            Person(id_number="1", first_name="יוסף", last_name="", street="", city="", house_number=""),
+            Person(id_number="2", first_name="יוסי", last_name="", street="", city="", house_number=""),
+        ]))
+        by_nickname = {match.person.id_number: match.score for match in locator.search(first_name="יוסי")}
+        by_full_name = {match.person.id_number: match.score for match in locator.search(first_name="יוסף")}
+        self.assertAlmostEqual(by_nickname["1"], 90.0)
+        self.assertAlmostEqual(by_full_name["2"], 90.0)
+
+    def test_repository_precomputes_normalized_columns(self) -> None:
+        repository = PersonRepository([
+            Person(id_number="1", first_name=" Ben-Gurion ", last_name="", street="", city="", house_number=""),
+        ])
+        value = repository.normalized_column("first_name")[0]
+        self.assertEqual(value.stripped, "Ben-Gurion")
+        self.assertEqual(value.lower, "ben-gurion")
+        self.assertEqual(value.normalized, "ben gurion")
+
+    def test_search_encodes_only_the_query_with_soundex(self) -> None:
+        repository = load_sample_repository()
+        value = repository.normalized_column("last_name")[0]
+        self.assertEqual(value.soundex_codes, soundex_codes(value.stripped))
+
+        locator = IdentityLocator(repository)
+        with mock.patch("idlocator.normalization.soundex_codes", wraps=soundex_codes) as encode:
+            locator.search(last_name="כהן", use_soundex=True)
+        encode.assert_called_once_with("כהן")
+
+    def test_repository_encodes_columns_by_distinct_value(self) -> None:
+        repository = PersonRepository([
+            Person(id_number=str(i), first_name="", last_name="", street="", city=city, house_number="")
+            for i, city in enumerate(["חיפה", "אילת", "חיפה"])
+        ])
+        distinct = repository.distinct_values("city")
+        self.assertEqual([value.stripped for value in distinct], ["חיפה", "אילת"])
+        self.assertEqual(repository.value_ids("city"), [0, 1, 0])
+
     def test_city_search_handles_common_typo(self) -> None:
         locator = IdentityLocator(load_sample_repository())
         typo_city = "\u05d8\u05dc \u05d0\u05e4\u05d9\u05e3"
@@ -64,6 +142,114 @@ class IdentityLocatorTests(unittest.TestCase):
         self.assertTrue(any(match.person.city == correct_city for match in results))
 
 
+class PersonRepositoryTests(unittest.TestCase):
+    def test_from_csv_keeps_unquoted_gershayim_and_missing_columns(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / "people.csv"
+            csv_path.write_text(
+                "\ufeffid_number,first_name,street,city\n"
+                "1,עומרי,הפלמ\"ח,\"תל אביב, צפון\"\n",
+                encoding="utf-8",
+            )
+            repository = PersonRepository.from_csv(csv_path)
+        person = repository.find_by_id("1")
+        self.assertIsNotNone(person)
+        self.assertEqual(person.street, "הפלמ\"ח")
+        self.assertEqual(person.city, "תל אביב, צפון")
+        self.assertEqual(person.last_name, "")
+
+    def test_from_csv_with_duplicate_header_uses_last_column(self) -> None:
+        # כמו csv.DictReader: כשעמודה מופיעה פעמיים, הערך האחרון קובע
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / "people.csv"
+            csv_path.write_text(
+                "id_number,first_name,first_name\n"
+                "1,ראשון,אחרון\n",
+                encoding="utf-8",
+            )
+            repository = PersonRepository.from_csv(csv_path)
+        self.assertEqual(repository.find_by_id("1").first_name, "אחרון")
+
+
+class LevenshteinTests(unittest.TestCase):
+    def test_fast_and_fallback_implementations_agree(self) -> None:
+        pairs = [("", ""), ("כהן", ""), ("כהן", "כהן"), ("בן גוריון", "בן גריון"), ("kitten", "sitting")]
+        for s1, s2 in pairs:
+            self.assertAlmostEqual(
+                _levenshtein_similarity(s1, s2),
+                _python_levenshtein_similarity(s1, s2),
+                msg=f"{s1!r} / {s2!r}",
+            )
+
+    def test_bitparallel_distance_matches_dynamic_programming(self) -> None:
+        def reference(s1: str, s2: str) -> int:
+            previous_row = list(range(len(s2) + 1))
+            for i, c1 in enumerate(s1):
+                current_row = [i + 1]
+                for j, c2 in enumerate(s2):
+                    current_row.append(min(previous_row[j + 1] + 1, current_row[j] + 1, previous_row[j] + (c1 != c2)))
+                previous_row = current_row
+            return previous_row[-1]
+
+        words = ["", "א", "כהן", "קהן", "הכהן", "בן גוריון", "בן-גריון", "kitten", "sitting", "ab" * 40]
+        for s1 in words:
+            for s2 in words:
+                self.assertEqual(_bitparallel_levenshtein_distance(s1, s2), reference(s1, s2), msg=f"{s1!r} / {s2!r}")
+
+
+    @unittest.skipIf(jit_levenshtein_similarity is None, "numba is not installed")
+    def test_jit_similarity_matches_python_fallback(self) -> None:
+        words = ["", "כהן", "קהן", "בן גוריון", "בן גריון", "kitten", "sitting"]
+        for s1 in words:
+            for s2 in words:
+                self.assertAlmostEqual(
+                    jit_levenshtein_similarity(s1, s2),
+                    _python_levenshtein_similarity(s1, s2),
+                    msg=f"{s1!r} / {s2!r}",
+                )
+
+    @unittest.skipIf(jit_batch_levenshtein_similarity is None, "numba is not installed")
+    def test_jit_batch_similarity_matches_pairwise(self) -> None:
+        words = ["", "כהן", "קהן", "בן גוריון", "בן גריון", "kitten", "sitting"]
+        for query in words:
+            batch = jit_batch_levenshtein_similarity(query, words, 0.8)
+            self.assertEqual(jit_batch_levenshtein_similarity(query, words, 0.8, parallel=True), batch)
+            for word, similarity in zip(words, batch):
+                reference = _python_levenshtein_similarity(query, word)
+                # מתחת לסף מובטח רק שהתוצאה נשארת מתחת לסף
+                if reference >= 0.8:
+                    self.assertAlmostEqual(similarity, reference, msg=f"{query!r} / {word!r}")
+                else:
+                    self.assertLess(similarity, 0.8, msg=f"{query!r} / {word!r}")
+
+    @unittest.skipIf(jit_batch_levenshtein_similarity is None, "numba is not installed")
+    def test_parallel_jit_batch_is_safe_from_many_threads(self) -> None:
+        # שכבת workqueue מפילה את התהליך בקריאות מקבילות בו-זמניות, ולכן הבדיקה
+        # רצה בתהליך נפרד שבו היא נבחרת במפורש
+        script = (
+            "import threading\n"
+            "from idlocator._distance import jit_batch_levenshtein_similarity as batch\n"
+            "values = ['%x' % (i * 7919) for i in range(20000)]\n"
+            "expected = batch('abcde', values, 0.0)\n"
+            "def run():\n"
+            "    for _ in range(20):\n"
+            "        assert batch('abcde', values, 0.0, parallel=True) == expected\n"
+            "threads = [threading.Thread(target=run) for _ in range(4)]\n"
+            "for thread in threads: thread.start()\n"
+            "for thread in threads: thread.join()\n"
+        )
+        environment = dict(os.environ, NUMBA_THREADING_LAYER="workqueue")
+        completed = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=Path(__file__).resolve().parents[1],
+            env=environment,
+            capture_output=True,
+            text=True,
+            timeout=300,
+        )
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+
+
 class SoundexTests(unittest.TestCase):
     def test_soundex_basic(self) -> None:
         self.assertEqual(soundex("Cohen"), soundex("Kohen"))
@@ -95,6 +281,52 @@ class SoundexTests(unittest.TestCase):
         self.assertTrue(compare_soundex("שם", "שמ"), "אות סופית 'ם' צריכה להיות שוות ערך ל-'מ'")
         self.assertTrue(compare_soundex("ארץ", "ארצ"), "אות סופית 'ץ' צריכה להיות שוות ערך ל-'צ'")
 
+    def test_soundex_ignores_non_letters(self) -> None:
+        self.assertEqual(soundex("O'Brien-Smith"), soundex("OBrienSmith"))
+        self.assertEqual(soundex("מֹשֶׁה"), soundex("משה"))
+        self.assertIsNone(soundex("123 - !"))
+
+    def test_translate_tables_do_not_grow_with_input(self) -> None:
+        from idlocator import soundex as soundex_module
+
+        sizes = [len(table) for table in soundex_module._TRANSLATE_TABLES.values()]
+        rare = "".join(chr(ordinal) for ordinal in range(0x0600, 0x0700))
+        soundex_codes("כהן" + rare)
+        soundex_codes("Cohen" + rare)
+        self.assertEqual([len(table) for table in soundex_module._TRANSLATE_TABLES.values()], sizes)
+
+    def test_long_values_are_not_memoized(self) -> None:
+        from idlocator import soundex as soundex_module
+
+        caches = (soundex_module._soundex_codes, soundex_module._cached_soundex, daitch_mokotoff)
+        sizes = [cache.cache_info().currsize for cache in caches]
+        long_value = "Cohen " * 20
+        self.assertTrue(soundex_codes(long_value))
+        self.assertTrue(daitch_mokotoff(long_value))
+        self.assertEqual([cache.cache_info().currsize for cache in caches], sizes)
+
+    def test_daitch_mokotoff_reference_codes(self) -> None:
+        self.assertEqual(daitch_mokotoff("Peters"), {"734000", "739400"})
+        self.assertEqual(daitch_mokotoff("Jackson"), {"154600", "454600", "145460", "445460"})
+        self.assertEqual(daitch_mokotoff("Moskowitz"), daitch_mokotoff("Moskovitz"))
+        # לאלגוריתם אין כללים לעברית
+        self.assertEqual(daitch_mokotoff("כהן"), frozenset())
+
+    def test_search_with_daitch_mokotoff(self) -> None:
+        repository = PersonRepository([
+            Person(id_number="1", first_name="Anna", last_name="Schwartz", street="Main", city="Haifa", house_number="1"),
+        ])
+        self.assertEqual(IdentityLocator(repository).search(last_name="Shvarts"), [])
+
+        locator = IdentityLocator(repository, phonetic_algorithm="daitch_mokotoff")
+        results = locator.search(last_name="Shvarts")
+        self.assertEqual([match.person.id_number for match in results], ["1"])
+        self.assertAlmostEqual(results[0].score, 75.0)
+
+    def test_unknown_phonetic_algorithm_is_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            IdentityLocator(PersonRepository([]), phonetic_algorithm="metaphone")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,25 +1,43 @@
 """בדיקות UI בסיסיות לממשק ה-CLI של הפרויקט."""
 from __future__ import annotations
 
+import contextlib
+import io
 import os
 import subprocess
 import sys
 from pathlib import Path
+from types import SimpleNamespace
 import unittest
 
+from idlocator.cli import main as cli_main
+
 ROOT_DIR = Path(__file__).resolve().parents[2]
 
 
 class CLITestCase(unittest.TestCase):
     """בדיקות ממשק משתמש דרך שורת הפקודה."""
 
-    def run_cli(self, *args: str) -> subprocess.CompletedProcess[str]:
+    def run_cli(self, *args: str) -> SimpleNamespace:
+        # ה-CLI רץ בתוך תהליך הבדיקות, בלי לשלם על הפעלת מפרש וייבוא בכל בדיקה
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            try:
+                returncode = cli_main(list(args))
+            except SystemExit as exit_:
+                returncode = exit_.code
+        return SimpleNamespace(returncode=returncode, stdout=stdout.getvalue(), stderr=stderr.getvalue())
+
+    def run_cli_subprocess(self, *args: str) -> subprocess.CompletedProcess[str]:
         env = os.environ.copy()
         env["PYTHONUTF8"] = "1"  # Force subprocess to use UTF-8
         command = [sys.executable, "-m", "idlocator.cli", *args]
         return subprocess.run(
             command,
             cwd=ROOT_DIR,
+            check=False,
+            stdin=subprocess.DEVNULL,
+            close_fds=False,  # אין צורך לסגור את כל מתארי הקבצים לפני ההפעלה
             capture_output=True,
             text=True,
             encoding="utf-8",  # Expect UTF-8 output
@@ -38,6 +56,20 @@ class CLITestCase(unittest.TestCase):
         self.assertEqual(result.returncode, 1, msg=f"Expected return code 1 for no results, but got {result.returncode}. Stderr: {result.stderr}")
         self.assertIn("לא נמצאו תוצאות", result.stdout)
 
+    def test_cli_rejects_non_positive_limit(self) -> None:
+        for limit in ("0", "-3", "abc"):
+            result = self.run_cli("--last-name", "כהן", "--limit", limit)
+            self.assertEqual(result.returncode, 2, msg=result.stdout)
+            self.assertIn("--limit", result.stderr)
+        result = self.run_cli("--last-name", "כהן", "--limit", "1")
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+
+    def test_cli_module_runs_as_script(self) -> None:
+        # בדיקת עשן אחת להפעלה דרך python -m
+        result = self.run_cli_subprocess("--id", "000000000")
+        self.assertEqual(result.returncode, 1, msg=result.stderr)
+        self.assertIn("לא נמצאו תוצאות", result.stdout)
+
 
 if __name__ == "__main__":
     unittest.main()
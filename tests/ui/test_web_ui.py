@@ -2,71 +2,211 @@
 from __future__ import annotations
 
 import io
+import threading
 import unittest
+from concurrent.futures import Future
+from unittest import mock
 
-from idlocator.web.app import app
+from idlocator.web import app as web_app
+from idlocator.web.app import create_app
+
+# מחרוזות שהבדיקות מחפשות בתשובות, מקודדות פעם אחת
+_TITLE = "Id Locator".encode("utf-8")
+_ADVANCED_SEARCH = "חיפוש מתקדם".encode("utf-8")
+_NO_RESULTS = "לא נמצאו תוצאות לחיפוש הנוכחי".encode("utf-8")
+_RESET_MSG = "נתוני הדוגמה נטענו מחדש.".encode("utf-8")
+_FILE_LOADED = "קובץ 'test.csv' נטען בהצלחה.".encode("utf-8")
+_SLOW_FILE_LOADED = "הקובץ &#39;slow.csv&#39; נטען בהצלחה.".encode("utf-8")
+_TOO_MANY_ROWS = "הקובץ גדול מדי".encode("utf-8")
+_SERVER_BUSY = "השרת מעבד כעת קבצים רבים".encode("utf-8")
+_TRUNCATED_RESULTS = "ההתאמות הטובות ביותר".encode("utf-8")
+_CONTENT_ERROR = "שגיאה בתוכן הקובץ".encode("utf-8")
+
+_TEST_CSV = (
+    b"id_number,first_name,last_name,street,city,house_number\n"
+    b"987654321,Test,User,Python,Flask,123\n"
+)
+_TEST_CSV_ID = b"987654321"
 
 
 class WebUITestCase(unittest.TestCase):
     """בדיקות ממשק משתמש ווב (Flask)."""
 
-    def setUp(self) -> None:
-        """הגדרת ה-test client של Flask."""
-        app.config["TESTING"] = True
-        app.config["WTF_CSRF_ENABLED"] = False  # Disable CSRF for testing forms
-        self.client = app.test_client()
+    @classmethod
+    def setUpClass(cls) -> None:
+        """הגדרת ה-test client של Flask, פעם אחת לכל הבדיקות במחלקה.
+
+        כל מחלקה יוצרת מופע אפליקציה משלה, כך שהבדיקות אינן משנות את המופע
+        הגלובלי ואפשר להריץ אותן במקביל (למשל pytest -n auto).
+        """
+        cls.app = create_app({"TESTING": True, "WTF_CSRF_ENABLED": False})  # Disable CSRF for testing forms
+        cls.client = cls.app.test_client()
+        cls._app_context = cls.app.app_context()
+        cls._app_context.push()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls._app_context.pop()
+
+    def _reset_dataset_after_test(self) -> None:
+        """ה-client משותף לכל הבדיקות, ולכן בדיקה שמעלה קובץ מחזירה את נתוני הדוגמה בסיומה."""
+        self.addCleanup(self.client.post, "/", data={"reset_sample": "1"})
 
     def test_index_page_loads(self) -> None:
         """בדיקה שהדף הראשי נטען בהצלחה (GET)."""
         response = self.client.get("/")
         self.assertEqual(response.status_code, 200)
-        self.assertIn("Id Locator".encode("utf-8"), response.data)
-        self.assertIn("חיפוש מתקדם".encode("utf-8"), response.data)
+        self.assertIn(_TITLE, response.data)
+        self.assertIn(_ADVANCED_SEARCH, response.data)
 
     def test_search_returns_results(self) -> None:
         """בדיקת פונקציונליות החיפוש עם נתוני הדוגמה."""
         response = self.client.post("/", data={"first_name": "אור", "last_name": "כהן"})
         self.assertEqual(response.status_code, 200)
-        self.assertIn("200000001".encode("utf-8"), response.data)  # ID of 'אור כהן'
-        self.assertIn("<td>100.0</td>".encode("utf-8"), response.data)  # Perfect score
+        self.assertIn(b"200000001", response.data)  # ID of 'אור כהן'
+        self.assertIn(b"<td>100.0</td>", response.data)  # Perfect score
+
+    def test_truncated_results_show_notice(self) -> None:
+        """בדיקה שהדף מודיע כשמוצגות רק ההתאמות הטובות ביותר."""
+        with mock.patch.object(web_app, "_MAX_DISPLAYED_RESULTS", 1):
+            response = self.client.post("/", data={"city": "תל אביב"})
+            self.assertIn(_TRUNCATED_RESULTS, response.data)
+            # בדיוק התאמה אחת: שום תוצאה לא נחתכה, ולכן אין הודעה
+            response = self.client.post("/", data={"first_name": "אור", "last_name": "כהן"})
+            self.assertNotIn(_TRUNCATED_RESULTS, response.data)
 
     def test_search_no_results(self) -> None:
         """בדיקה שהודעה מתאימה מוצגת כשאין תוצאות חיפוש."""
         response = self.client.post("/", data={"first_name": "משתמש", "last_name": "לאקיים"})
         self.assertEqual(response.status_code, 200)
-        self.assertIn("לא נמצאו תוצאות לחיפוש הנוכחי".encode("utf-8"), response.data)
+        self.assertIn(_NO_RESULTS, response.data)
 
     def test_reset_to_sample_data(self) -> None:
         """בדיקת איפוס לנתוני הדוגמה."""
         response = self.client.post("/", data={"reset_sample": "1"})
         self.assertEqual(response.status_code, 200)
-        self.assertIn("נתוני הדוגמה נטענו מחדש.".encode("utf-8"), response.data)
+        self.assertIn(_RESET_MSG, response.data)
 
     def test_file_upload_success(self) -> None:
         """בדיקת העלאת קובץ CSV תקין."""
-        csv_data = (
-            b"id_number,first_name,last_name,street,city,house_number\n"
-            b"987654321,Test,User,Python,Flask,123\n"
-        )
+        self._reset_dataset_after_test()
         data = {
-            "csv_file": (io.BytesIO(csv_data), "test.csv"),
+            "csv_file": (io.BytesIO(_TEST_CSV), "test.csv"),
         }
         response = self.client.post("/", data=data, content_type="multipart/form-data")
         self.assertEqual(response.status_code, 200)
-        self.assertIn("קובץ 'test.csv' נטען בהצלחה.".encode("utf-8"), response.data)
+        self.assertIn(_FILE_LOADED, response.data)
         # Verify the new data is searchable
         search_response = self.client.post("/", data={"first_name": "Test"})
-        self.assertIn("987654321".encode("utf-8"), search_response.data)
+        self.assertIn(_TEST_CSV_ID, search_response.data)
+
+    def test_uploaded_file_is_kept_on_server_between_requests(self) -> None:
+        """בדיקה שקובץ שהועלה זמין לחיפושים הבאים בלי לשלוח אותו שוב."""
+        self._reset_dataset_after_test()
+        data = {"csv_file": (io.BytesIO(_TEST_CSV), "test.csv"), "upload": "1"}
+        response = self.client.post("/", data=data, content_type="multipart/form-data")
+        self.assertNotIn(b"people_data_payload", response.data)
+        search_response = self.client.post("/", data={"first_name": "Test"})
+        self.assertIn(_TEST_CSV_ID, search_response.data)
+
+        self.client.post("/", data={"reset_sample": "1"})
+        search_response = self.client.post("/", data={"first_name": "Test"})
+        self.assertNotIn(_TEST_CSV_ID, search_response.data)
+
+    def test_uploaded_dataset_is_not_serialized_into_the_response(self) -> None:
+        """בדיקה שגודל התשובה והעוגייה אינו תלוי בגודל הקובץ שהועלה."""
+        self._reset_dataset_after_test()
+        csv_lines = [b"id_number,first_name,last_name,street,city,house_number"]
+        csv_lines += [b"%09d,Name%d,Family,Street,City,%d" % (i, i, i) for i in range(2000)]
+        data = {"csv_file": (io.BytesIO(b"\n".join(csv_lines)), "big.csv"), "upload": "1"}
+        response = self.client.post("/", data=data, content_type="multipart/form-data")
+        cookie = response.headers.get("Set-Cookie", "")
+        self.assertLess(len(cookie), 512)
+        search_response = self.client.post("/", data={"id_number": "000001999"})
+        self.assertIn(b"000001999", search_response.data)
+
+    def test_large_upload_is_processed_in_background(self) -> None:
+        """בדיקה שקובץ שעיבודו מתארך אינו מעכב את התשובה, והדף מדווח על המצב."""
+        self._reset_dataset_after_test()
+        release = threading.Event()
+        parse_upload = web_app._parse_upload
+
+        def slow_parse(data: bytes):
+            release.wait(5)
+            return parse_upload(data)
+
+        with mock.patch.object(web_app, "_parse_upload", slow_parse):
+            data = {"csv_file": (io.BytesIO(_TEST_CSV), "slow.csv"), "upload": "1"}
+            response = self.client.post("/", data=data, content_type="multipart/form-data")
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(self.client.get("/dataset/status").get_json(), {"status": "processing"})
+            release.set()
+            web_app._cached_entry(self._dataset_token()).future.result(5)
+
+        self.assertEqual(self.client.get("/dataset/status").get_json(), {"status": "ready"})
+        response = self.client.get("/")
+        self.assertIn(_SLOW_FILE_LOADED, response.data)
+        search_response = self.client.post("/", data={"first_name": "Test"})
+        self.assertIn(_TEST_CSV_ID, search_response.data)
+
+    def test_upload_over_row_limit_is_rejected(self) -> None:
+        """בדיקה שקובץ עם יותר רשומות מהמותר אינו נטען."""
+        self._reset_dataset_after_test()
+        with mock.patch.object(web_app, "_MAX_UPLOAD_ROWS", 1):
+            csv_data = _TEST_CSV + b"123456789,Other,User,Python,Flask,1\n"
+            data = {"csv_file": (io.BytesIO(csv_data), "big.csv"), "upload": "1"}
+            response = self.client.post("/", data=data, content_type="multipart/form-data")
+        self.assertIn(_TOO_MANY_ROWS, response.data)
+        search_response = self.client.post("/", data={"first_name": "Test"})
+        self.assertNotIn(_TEST_CSV_ID, search_response.data)
+
+    def test_locator_cache_evicts_by_total_rows(self) -> None:
+        """בדיקה שהמטמון מפנה מאגרים ישנים כשסך הרשומות עובר את התקציב."""
+        locator = web_app._parse_upload(_TEST_CSV)
+        with mock.patch.object(web_app, "_LOCATOR_CACHE_MAX_ROWS", 1):
+            first = web_app._store_locator(locator)
+            second = web_app._store_locator(locator)
+        self.addCleanup(web_app._discard_locator, second)
+        self.assertIsNone(web_app._cached_locator(first))
+        self.assertIs(web_app._cached_locator(second), locator)
+
+    def test_removed_pending_uploads_are_cancelled(self) -> None:
+        """בדיקה שקובץ שממתין לעיבוד ויוצא מהמטמון אינו מעובד לשווא."""
+        discarded = web_app._PendingUpload("discarded.csv", Future())
+        web_app._discard_locator(web_app._store_locator(discarded))
+        self.assertTrue(discarded.future.cancelled())
+
+        evicted = web_app._PendingUpload("evicted.csv", Future())
+        with mock.patch.object(web_app, "_LOCATOR_CACHE_MAX_ENTRIES", 1):
+            web_app._store_locator(evicted)
+            self.addCleanup(web_app._discard_locator, web_app._store_locator(web_app._parse_upload(_TEST_CSV)))
+        self.assertTrue(evicted.future.cancelled())
+
+    def test_upload_is_rejected_when_too_many_are_processing(self) -> None:
+        """בדיקה שהעלאה נדחית (429) כשכבר יש יותר מדי קבצים בעיבוד."""
+        self._reset_dataset_after_test()
+        with mock.patch.object(web_app, "_MAX_PENDING_UPLOADS", 0):
+            data = {"csv_file": (io.BytesIO(_TEST_CSV), "busy.csv"), "upload": "1"}
+            response = self.client.post("/", data=data, content_type="multipart/form-data")
+        self.assertEqual(response.status_code, 429)
+        self.assertIn(_SERVER_BUSY, response.data)
+        search_response = self.client.post("/", data={"first_name": "Test"})
+        self.assertNotIn(_TEST_CSV_ID, search_response.data)
+
+    def _dataset_token(self) -> str:
+        with self.client.session_transaction() as session:
+            return session["dataset_token"]
 
     def test_file_upload_invalid_content(self) -> None:
         """בדיקת העלאת קובץ CSV ריק או לא תקין."""
+        self._reset_dataset_after_test()
         csv_data = b"header1,header2\ninvalid,row"
         data = {
             "csv_file": (io.BytesIO(csv_data), "invalid.csv"),
         }
         response = self.client.post("/", data=data, content_type="multipart/form-data")
         self.assertEqual(response.status_code, 200)
-        self.assertIn("שגיאה בתוכן הקובץ".encode("utf-8"), response.data)
+        self.assertIn(_CONTENT_ERROR, response.data)
 
 
 if __name__ == "__main__":